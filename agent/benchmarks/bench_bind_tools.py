@@ -0,0 +1,44 @@
+"""
+Microbenchmark: binding the chat_node tools on every turn vs. reusing the
+cached runnable from bind_tools_cached.
+
+Run from the agent directory:
+
+    poetry run python benchmarks/bench_bind_tools.py
+
+No requests are sent; a dummy API key is enough to construct the model.
+"""
+
+import os
+import timeit
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+os.environ.setdefault("TAVILY_API_KEY", "tvly-benchmark")
+
+# pylint: disable=wrong-import-position
+from research_canvas.langgraph.state import AgentState
+from research_canvas.langgraph.model import get_model, bind_tools_cached
+from research_canvas.langgraph.chat import CHAT_TOOLS
+from research_canvas.langgraph.search import ExtractResources
+
+ROUNDS = 200
+
+def main():
+    """Run the benchmark."""
+    model = get_model(AgentState({"model": os.getenv("MODEL", "openai")}))
+
+    for name, tools, kwargs in (
+        ("chat_node (13 tools)", CHAT_TOOLS, {}),
+        ("search_node (ExtractResources)", [ExtractResources], {"tool_choice": "ExtractResources"}),
+    ):
+        uncached = timeit.timeit(lambda: model.bind_tools(tools, **kwargs), number=ROUNDS)
+        bind_tools_cached(model, tools, **kwargs)
+        cached = timeit.timeit(lambda: bind_tools_cached(model, tools, **kwargs), number=ROUNDS)
+        print(
+            f"{name}: bind_tools {uncached / ROUNDS * 1000:.3f} ms/turn, "
+            f"cached {cached / ROUNDS * 1000:.4f} ms/turn "
+            f"({uncached / cached:.0f}x)"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: checkpoint size and (de)serialization time of the default
+serializer vs. CompressedSerializer on a realistic research thread.
+
+Run from the agent directory:
+
+    poetry run python benchmarks/bench_checkpoint_serde.py
+
+Every super-step stores the channels it changed, so the thread below is
+serialized channel by channel after each step, as the checkpointer does.
+"""
+
+import json
+import time
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from research_canvas.langgraph.serde import CompressedSerializer, zstandard
+
+TURNS = 20
+ROUNDS = 5
+
+def _resources(turn):
+    return [
+        {
+            "url": f"https://example.com/marketing/{turn}/{i}",
+            "title": f"Marketing insight #{turn}.{i}",
+            "description": "A practical guide to planning, targeting and measuring campaigns.",
+        }
+        for i in range(3)
+    ]
+
+def build_steps():
+    """
+    Get the channel values written by each super-step of a thread.
+    """
+    steps = []
+    messages = []
+    resources = []
+    report = ""
+    for turn in range(TURNS):
+        messages = messages + [HumanMessage(content=f"Find sources about topic {turn} for our spring campaign.")]
+        steps.append({"messages": messages})
+
+        call_id = f"call_{turn}"
+        messages = messages + [AIMessage(content="", tool_calls=[{
+            "id": call_id, "name": "Search", "args": {"queries": [f"topic {turn} marketing"]},
+        }])]
+        steps.append({"messages": messages})
+
+        resources = resources + _resources(turn)
+        messages = messages + [
+            ToolMessage(
+                tool_call_id=call_id,
+                content="Performed search: " + json.dumps([
+                    {"url": r["url"], "title": r["title"], "snippet": r["description"] * 4}
+                    for r in _resources(turn)
+                ])
+            ),
+            ToolMessage(tool_call_id=call_id, content=f"Added the following resources: {resources}"),
+        ]
+        steps.append({
+            "messages": messages,
+            "resources": resources,
+            "logs": [{"message": f"Search for topic {turn} marketing", "done": True}],
+        })
+
+        report += f"\n\n## Section {turn}\n\n" + (
+            "Our campaign targets young professionals through social channels, "
+            "measuring reach, engagement and conversion against the quarterly budget. "
+        ) * 6
+        messages = messages + [AIMessage(content="I have updated the draft.")]
+        steps.append({"messages": messages, "report": report})
+    return steps
+
+def measure(serde, steps):
+    """
+    Get (bytes, dump seconds, load seconds) for serializing all steps.
+    """
+    dumped = []
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        dumped = [serde.dumps_typed(value) for step in steps for value in step.values()]
+    dump_time = (time.perf_counter() - start) / ROUNDS
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for data in dumped:
+            serde.loads_typed(data)
+    load_time = (time.perf_counter() - start) / ROUNDS
+
+    return sum(len(data) for _, data in dumped), dump_time, load_time
+
+def main():
+    """Run the benchmark."""
+    steps = build_steps()
+    serdes = [("default", JsonPlusSerializer()), ("zlib", CompressedSerializer(compression="zlib"))]
+    if zstandard is not None:
+        serdes.append(("zstd", CompressedSerializer(compression="zstd")))
+
+    baseline = None
+    for name, serde in serdes:
+        size, dump_time, load_time = measure(serde, steps)
+        baseline = baseline or size
+        print(
+            f"{name:8} {size / 1024:9.1f} KiB ({size / baseline:6.1%})  "
+            f"dump {dump_time * 1000:7.2f} ms  load {load_time * 1000:7.2f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Illustration (not a measurement): LLM invocations of a scripted session when
+chat_node applies one tool call per response (as with
+parallel_tool_calls=False) vs. all tool calls of a response in one pass.
+
+Run from the agent directory:
+
+    poetry run python benchmarks/bench_tool_calls.py
+
+The model is a fake that replays scripted responses, so no requests are
+sent. The responses go through the real chat_node and tool routing, and the
+session fails unless every tool call is answered. The invocation counts
+themselves follow from the script (one response per tool call plus a reply
+per turn, vs. one response per turn plus a reply), not from how often a
+real model batches its calls.
+"""
+
+import asyncio
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from research_canvas.langgraph import chat
+
+# The user answers the customization questions in one message each
+TURNS = [
+    (
+        "Goals: more sign-ups. Channels: Instagram and email. Budget: $5,000.",
+        [
+            ("SetCampaignGoals", {"goals": "More sign-ups"}),
+            ("SelectMarketingChannels", {"channels": "Instagram, email"}),
+            ("SetCampaignBudget", {"budget": "$5,000"}),
+        ],
+    ),
+    (
+        "Audience: students aged 18-24 in Berlin.",
+        [
+            ("SelectAgeRange", {"age_range": "18-24"}),
+            ("DefineTargetAudience", {"audience_description": "Students in Berlin", "age_range": "18-24"}),
+        ],
+    ),
+    (
+        "Create the campaign 'Spring Sign-ups' and write a brief.",
+        [
+            ("CreateCampaign", {"title": "Spring Sign-ups"}),
+            ("WriteCampaignBrief", {"campaign_brief": "Drive student sign-ups this spring."}),
+        ],
+    ),
+]
+
+class FakeModel:
+    """Replays scripted responses and counts invocations."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.invocations = 0
+
+    def bind_tools(self, tools, **kwargs): # pylint: disable=unused-argument
+        """Tools are ignored."""
+        return self
+
+    async def ainvoke(self, messages, config=None): # pylint: disable=unused-argument
+        """Return the next scripted response."""
+        self.invocations += 1
+        return self.responses.pop(0)
+
+def script(parallel: bool):
+    """
+    Get the model responses of the session: one tool call per response, or
+    all calls of a turn in one response. Every turn ends with a text reply.
+    """
+    responses = []
+    for turn, (_, calls) in enumerate(TURNS):
+        tool_calls = [
+            {"id": f"call_{turn}_{i}", "name": name, "args": args}
+            for i, (name, args) in enumerate(calls)
+        ]
+        if parallel:
+            responses.append(AIMessage(content="", tool_calls=tool_calls))
+        else:
+            responses.extend(AIMessage(content="", tool_calls=[tool_call]) for tool_call in tool_calls)
+        responses.append(AIMessage(content="Done, what's next?"))
+    return responses
+
+async def run_session(parallel: bool) -> int:
+    """Run the session through chat_node and get the number of LLM invocations."""
+    model = FakeModel(script(parallel))
+    chat.get_model = lambda state, config=None: model
+    chat.bind_tools_cached = lambda model, tools, **kwargs: model
+    # Measure the tool executor alone, without the template fast path
+    chat.menu_choice = lambda messages: None
+    chat.fast_path_reply = lambda tool_calls: None
+
+    state = {"messages": [], "resources": [], "campaigns": []}
+    for user_message, _ in TURNS:
+        state["messages"].append(HumanMessage(content=user_message))
+        goto = "chat_node"
+        while goto == "chat_node":
+            command = await chat.chat_node(state, {})
+            update = dict(command.update)
+            messages = update.pop("messages")
+            state["messages"].extend(messages if isinstance(messages, list) else [messages])
+            state.update(update)
+            goto = command.goto
+    answered = {
+        message.tool_call_id for message in state["messages"] if isinstance(message, ToolMessage)
+    }
+    requested = {
+        call["id"] for message in state["messages"]
+        for call in getattr(message, "tool_calls", None) or []
+    }
+    assert answered == requested and not model.responses, "session did not run as scripted"
+    return model.invocations
+
+def main():
+    """Run the benchmark."""
+    sequential = asyncio.run(run_session(parallel=False))
+    parallel = asyncio.run(run_session(parallel=True))
+    print("Scripted session, not a measurement of real model behaviour:")
+    print(f"{len(TURNS)} turns, one tool call per response:  {sequential} LLM invocations")
+    print(f"{len(TURNS)} turns, all tool calls in one pass: {parallel} LLM invocations")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Check: the model a graph is created with reaches get_model in its nodes.
+
+Run from the agent directory:
+
+    poetry run python benchmarks/check_model_selection.py
+
+Model clients are replaced by a fake that records the provider it was
+created for, so no requests are sent.
+"""
+
+import asyncio
+from langchain_core.messages import AIMessage, HumanMessage
+from research_canvas.langgraph import chat, model
+from research_canvas.langgraph.agent import create_graph_with_model
+
+class FakeModel:
+    """Replies with a fixed message."""
+
+    def bind_tools(self, tools, **kwargs): # pylint: disable=unused-argument
+        """Tools are ignored."""
+        return self
+
+    async def ainvoke(self, messages, config=None): # pylint: disable=unused-argument
+        """Return the fixed reply."""
+        return AIMessage(content="Hello!")
+
+async def providers_used(model_name) -> list:
+    """Run one turn on a graph created with `model_name` and get the providers used."""
+    created = []
+    model._MODELS.clear() # pylint: disable=protected-access
+    model._create_model = lambda provider, name, params: created.append(provider) or FakeModel() # pylint: disable=protected-access
+    chat.bind_tools_cached = lambda model, tools, **kwargs: model
+
+    graph = create_graph_with_model(model_name)
+    await graph.ainvoke(
+        {"messages": [HumanMessage(content="Hi")], "resources": [], "campaigns": []},
+        {"configurable": {"thread_id": f"check-{model_name}"}}
+    )
+    return created
+
+def main():
+    """Run the check."""
+    for model_name in ("google_genai", "anthropic", "openai"):
+        created = asyncio.run(providers_used(model_name))
+        assert created == [model_name], f"graph for {model_name} used {created}"
+        print(f"{model_name}: ok")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+In-memory caches with a total byte budget, per-entry TTL and LRU eviction.
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+def _sizeof(value: Any) -> int:
+    """
+    Approximate the number of bytes a value occupies in the cache.
+    """
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return sys.getsizeof(value)
+
+class LRUCache:
+    """
+    A thread-safe LRU cache bounded by the total size of its values.
+
+    Entries expire `ttl` seconds after they were set (None disables expiry).
+    When the byte budget is exceeded, the least recently used entries are
+    evicted until the cache fits again. With `keep_stale`, expired entries are
+    not dropped on lookup but stay available through `peek` (e.g. for HTTP
+    revalidation) until they are evicted.
+    """
+
+    def __init__(self, max_bytes: int, ttl: Optional[float] = None, keep_stale: bool = False):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.keep_stale = keep_stale
+        self._entries = OrderedDict()  # key -> (value, size, expires_at)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Get a value from the cache, or `default` if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, _, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                if not self.keep_stale:
+                    self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key: str, default: Any = None) -> Any:
+        """
+        Get a value even if it has expired, without touching LRU order or counters.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry is not None else default
+
+    def set(self, key: str, value: Any, size: Optional[int] = None, ttl: Optional[float] = None):
+        """
+        Store a value, evicting least recently used entries to stay within budget.
+        Values larger than the whole budget are not cached.
+        """
+        size = _sizeof(value) if size is None else size
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if size > self.max_bytes:
+                return False
+            self._entries[key] = (value, size, expires_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+            return True
+
+    def delete(self, key: str):
+        """
+        Remove a value from the cache.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        """
+        Remove all values from the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self):
+        """
+        Get the cache counters.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# Downloaded resource content (markdown), shared by the langgraph and crewai agents
+RESOURCE_CACHE = LRUCache(
+    max_bytes=int(os.getenv("RESOURCE_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    ttl=float(os.getenv("RESOURCE_CACHE_TTL", str(24 * 60 * 60))),
+    keep_stale=True,
+)
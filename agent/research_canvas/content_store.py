@@ -0,0 +1,175 @@
+"""
+Persistent, on-disk store for downloaded resource content.
+
+The store is a SQLite database in WAL mode, so every worker process on a host
+can read it concurrently while one of them writes, and its content survives
+restarts. It is enabled by pointing RESOURCE_STORE_PATH at a database file.
+
+Rows are kept after they expire so they can be revalidated, but not forever:
+every RESOURCE_STORE_PRUNE_EVERY writes, rows fetched longer than
+RESOURCE_STORE_MAX_AGE ago are deleted, and then the least recently fetched
+rows until the content fits into RESOURCE_STORE_MAX_BYTES.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+def canonical_url(url: str) -> str:
+    """
+    Normalize a URL so that trivially different spellings share one entry:
+    lowercase scheme and host, no default port, no fragment, sorted query
+    parameters without utm_* tracking parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_")
+    ))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+class ContentStore:
+    """
+    A SQLite (WAL) backed store of converted resource content and fetch metadata,
+    keyed by canonical URL.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = None,
+        max_age: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        prune_every: int = 100
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self._puts = 0
+        self._puts_lock = threading.Lock()
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS resources (
+                    url TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    metadata TEXT NOT NULL DEFAULT '{}'
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS resources_fetched_at ON resources (fetched_at)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections may only be used on the thread that created them
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, url: str, include_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Get the stored entry for a URL, or None if it is missing or stale.
+        With `include_stale`, stale entries are returned with "stale" set.
+        """
+        row = self._connection().execute(
+            "SELECT content, fetched_at, metadata FROM resources WHERE url = ?",
+            (canonical_url(url),)
+        ).fetchone()
+        if row is None:
+            return None
+        content, fetched_at, metadata = row
+        stale = self.ttl is not None and fetched_at + self.ttl <= time.time()
+        if stale and not include_stale:
+            return None
+        return {
+            "content": content,
+            "fetched_at": fetched_at,
+            "metadata": json.loads(metadata),
+            "stale": stale,
+        }
+
+    def put(self, url: str, content: str, metadata: Optional[Dict[str, Any]] = None):
+        """
+        Store the content of a URL, replacing any previous entry.
+        """
+        self._connection().execute(
+            "INSERT OR REPLACE INTO resources (url, content, fetched_at, metadata) "
+            "VALUES (?, ?, ?, ?)",
+            (canonical_url(url), content, time.time(), json.dumps(metadata or {}))
+        )
+        with self._puts_lock:
+            self._puts += 1
+            due = self.prune_every > 0 and self._puts % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def touch(self, url: str):
+        """
+        Mark the entry of a URL as freshly fetched, e.g. after a 304 Not Modified.
+        """
+        self._connection().execute(
+            "UPDATE resources SET fetched_at = ? WHERE url = ?",
+            (time.time(), canonical_url(url))
+        )
+
+    def delete(self, url: str):
+        """
+        Remove the entry of a URL.
+        """
+        self._connection().execute(
+            "DELETE FROM resources WHERE url = ?", (canonical_url(url),)
+        )
+
+    def prune(self) -> int:
+        """
+        Delete rows older than `max_age`, then the least recently fetched rows
+        until the rest fits into `max_bytes`. Returns the number of rows deleted.
+        """
+        conn = self._connection()
+        deleted = 0
+        if self.max_age is not None:
+            deleted += conn.execute(
+                "DELETE FROM resources WHERE fetched_at < ?", (time.time() - self.max_age,)
+            ).rowcount
+        if self.max_bytes is not None:
+            deleted += conn.execute(
+                """
+                DELETE FROM resources WHERE url IN (
+                    SELECT url FROM (
+                        SELECT url, SUM(LENGTH(CAST(content AS BLOB)) + LENGTH(metadata))
+                            OVER (ORDER BY fetched_at DESC, url) AS total
+                        FROM resources
+                    ) WHERE total > ?
+                )
+                """,
+                (self.max_bytes,)
+            ).rowcount
+        return deleted
+
+
+_STORE_PATH = os.getenv("RESOURCE_STORE_PATH")
+
+CONTENT_STORE = ContentStore(
+    _STORE_PATH,
+    ttl=float(os.getenv("RESOURCE_STORE_TTL", str(7 * 24 * 60 * 60))),
+    max_age=float(os.getenv("RESOURCE_STORE_MAX_AGE", str(30 * 24 * 60 * 60))),
+    max_bytes=int(os.getenv("RESOURCE_STORE_MAX_BYTES", str(1024 * 1024 * 1024))),
+    prune_every=int(os.getenv("RESOURCE_STORE_PRUNE_EVERY", "100")),
+) if _STORE_PATH else None
@@ -0,0 +1,130 @@
+"""
+HTML to markdown conversion for downloaded resources.
+
+html2text is pure Python and takes tens to hundreds of milliseconds on large
+pages, which would block every other session served by the event loop. Pages
+above CONVERT_INLINE_MAX_BYTES are therefore converted in a process pool;
+small pages are still converted inline, where the pool round-trip would cost
+more than the conversion itself.
+
+This module is imported by the pool workers, so keep its imports light.
+"""
+
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+import html2text
+
+# Number of worker processes, 0 converts everything inline
+CONVERT_POOL_WORKERS = int(os.getenv("CONVERT_POOL_WORKERS", "2"))
+CONVERT_INLINE_MAX_BYTES = int(os.getenv("CONVERT_INLINE_MAX_BYTES", str(64 * 1024)))
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+class ConversionStats:
+    """
+    Counters for the conversion stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.inline = 0
+        self.pooled = 0
+        self.convert_seconds = 0.0
+        self.max_convert_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+
+    def enqueued(self):
+        """Record a conversion submitted to the pool."""
+        with self._lock:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+
+    def finished(self, pooled: bool, convert_seconds: float, wait_seconds: float = 0.0):
+        """Record a finished conversion."""
+        with self._lock:
+            if pooled:
+                self.pooled += 1
+                self.queue_depth -= 1
+            else:
+                self.inline += 1
+            self.convert_seconds += convert_seconds
+            self.max_convert_seconds = max(self.max_convert_seconds, convert_seconds)
+            self.wait_seconds += wait_seconds
+
+    def as_dict(self):
+        """Get the counters as a dict."""
+        with self._lock:
+            total = self.inline + self.pooled
+            return {
+                "inline": self.inline,
+                "pooled": self.pooled,
+                "avg_convert_seconds": self.convert_seconds / total if total else 0.0,
+                "max_convert_seconds": self.max_convert_seconds,
+                "avg_pool_wait_seconds": self.wait_seconds / self.pooled if self.pooled else 0.0,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+            }
+
+CONVERSION_STATS = ConversionStats()
+
+def _convert(html: str) -> Tuple[str, float]:
+    """
+    Convert HTML to markdown, returning the markdown and the time it took.
+    """
+    started = time.perf_counter()
+    markdown = html2text.html2text(html)
+    return markdown, time.perf_counter() - started
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _POOL # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is None:
+            # spawn, not fork: the server process runs threads (sqlite, aiohttp)
+            _POOL = ProcessPoolExecutor(
+                max_workers=CONVERT_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _POOL
+
+async def html_to_markdown(html: str) -> str:
+    """
+    Convert HTML to markdown without blocking the event loop on large pages.
+    """
+    if CONVERT_POOL_WORKERS <= 0 or len(html) <= CONVERT_INLINE_MAX_BYTES:
+        markdown, elapsed = _convert(html)
+        CONVERSION_STATS.finished(pooled=False, convert_seconds=elapsed)
+        return markdown
+
+    CONVERSION_STATS.enqueued()
+    started = time.perf_counter()
+    try:
+        markdown, elapsed = await asyncio.get_running_loop().run_in_executor(
+            _get_pool(), _convert, html
+        )
+    except BaseException:
+        CONVERSION_STATS.finished(pooled=True, convert_seconds=0.0)
+        raise
+    CONVERSION_STATS.finished(
+        pooled=True,
+        convert_seconds=elapsed,
+        wait_seconds=time.perf_counter() - started - elapsed,
+    )
+    return markdown
+
+def shutdown_pool():
+    """
+    Stop the worker processes, if they were started.
+    """
+    global _POOL # pylint: disable=global-statement
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
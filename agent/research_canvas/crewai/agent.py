@@ -43,7 +43,7 @@ class ResearchCanvasFlow(Flow[Dict[str, Any]]):
         """
         Listen for the download event.
         """
-        resources = get_resources(self.state)
+        resources = await get_resources(self.state)
         prompt = format_prompt(
             self.state["research_question"],
             self.state["report"],
@@ -1,41 +1,18 @@
 """
 Utility functions for downloading resources.
 """
-import aiohttp
-import html2text
 from typing_extensions import Dict, Any
 from copilotkit.crewai import copilotkit_emit_state
 from research_canvas.crewai.tools import prepare_state_for_serialization
-
-_RESOURCE_CACHE = {}
+from research_canvas import downloader
+from research_canvas.downloader import get_cached_resource, download_resource as _download_resource
+from research_canvas.retrieval import select_passages
 
 def get_resource(url: str):
     """
     Get a resource from the cache.
     """
-    return _RESOURCE_CACHE.get(url, "")
-
-_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3" # pylint: disable=line-too-long
-
-async def _download_resource(url: str):
-    """
-    Download a resource from the internet asynchronously.
-    """
-    try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                url,
-                headers={"User-Agent": _USER_AGENT},
-                timeout=aiohttp.ClientTimeout(total=10)
-            ) as response:
-                response.raise_for_status()
-                html_content = await response.text()
-                markdown_content = html2text.html2text(html_content)
-                _RESOURCE_CACHE[url] = markdown_content
-                return markdown_content
-    except Exception as e: # pylint: disable=broad-except
-        _RESOURCE_CACHE[url] = "ERROR"
-        return f"Error downloading resource: {e}"
+    return downloader.get_resource(url)
 
 
 async def download_resources(state: Dict[str, Any]):
@@ -50,7 +27,7 @@ async def download_resources(state: Dict[str, Any]):
 
     # Find resources that are not downloaded
     for resource in state["resources"]:
-        if not get_resource(resource["url"]):
+        if await get_cached_resource(resource["url"]) is None:
             resources_to_download.append(resource)
             state["logs"].append({
                 "message": f"Downloading {resource['url']}",
@@ -70,19 +47,25 @@ async def download_resources(state: Dict[str, Any]):
         serializable_state = prepare_state_for_serialization(state)
         await copilotkit_emit_state(serializable_state)
 
-def get_resources(state: Dict[str, Any]):
+async def get_resources(state: Dict[str, Any]):
     """
-    Get the resources from the state.
+    Get the resources from the state, with the passages that are relevant to
+    the latest user message.
     """
     resources = []
 
     for resource in state["resources"]:
-        content = get_resource(resource["url"])
-        if content == "ERROR":
+        entry = await get_cached_resource(resource["url"])
+        if entry is not None and entry["error"]:
             continue
         resources.append({
             **resource,
-            "content": content
+            "content": entry["content"] if entry is not None else ""
         })
 
-    return resources
+    query = next(
+        (str(message.get("content") or "") for message in reversed(state["messages"])
+         if message.get("role") == "user"),
+        ""
+    )
+    return select_passages(resources, query)
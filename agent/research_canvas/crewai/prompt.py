@@ -27,6 +27,7 @@ def format_prompt(
         This is the research report:
         {report}
 
-        Here are the resources that you have available:
+        Here are the resources that you have available, with the passages
+        most relevant to the conversation:
         {resources}
     """
\ No newline at end of file
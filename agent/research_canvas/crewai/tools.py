@@ -1,18 +1,16 @@
 """
 Tools
 """
-import os
 import json
 from typing_extensions import Dict, Any, List, cast
-from tavily import TavilyClient
 from copilotkit.crewai import copilotkit_emit_state, copilotkit_predict_state, copilotkit_stream
 from litellm import completion
 from litellm.types.utils import Message as LiteLLMMessage, ChatCompletionMessageToolCall
+from research_canvas.searcher import search_all, compact_search_results
+from research_canvas.llm_cache import llm_cache_enabled, make_key, llm_cache_get, llm_cache_put
 
 HITL_TOOLS = ["DeleteResources"]
 
-tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
-
 # Custom JSON encoder to handle Message objects
 class MessageEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -141,6 +139,7 @@ async def perform_search(state: Dict[str, Any], queries: List[str], tool_call_id
     """
     state["resources"] = state.get("resources", [])
     state["logs"] = state.get("logs", [])
+    logs_offset = len(state["logs"])
 
     for query in queries:
         state["logs"].append({
@@ -152,16 +151,14 @@ async def perform_search(state: Dict[str, Any], queries: List[str], tool_call_id
     serializable_state = prepare_state_for_serialization(state)
     await copilotkit_emit_state(serializable_state)
 
-    search_results = []
-
-    for i, query in enumerate(queries):
-        response = tavily_client.search(query)
-        search_results.append(response)
-        state["logs"][i]["done"] = True
+    async def on_done(i: int):
+        state["logs"][logs_offset + i]["done"] = True
         # Use the prepared state for serialization
         serializable_state = prepare_state_for_serialization(state)
         await copilotkit_emit_state(serializable_state)
 
+    search_results = await search_all(queries, on_done)
+
     await copilotkit_predict_state(
         {
             "resources": {
@@ -171,36 +168,48 @@ async def perform_search(state: Dict[str, Any], queries: List[str], tool_call_id
         }
     )
 
-    response = await copilotkit_stream(
-        completion(
-            model="openai/gpt-4o",
-            messages=[
-                {
-                    "role": "system", 
-                    "content": "You need to extract the 3-5 most relevant resources from the following search results."
-                },
-                *state["messages"],
-                {
-                    "role": "tool",
-                    "content": f"Performed search: {search_results}",
-                    "tool_call_id": tool_call_id
-                }
-            ],
-            tools=[EXTRACT_RESOURCES_TOOL],
-            tool_choice="required",
-            parallel_tool_calls=False,
-            stream=True
+    model = "openai/gpt-4o"
+    messages = [
+        {
+            "role": "system", 
+            "content": "You need to extract the 3-5 most relevant resources from the following search results."
+        },
+        *state["messages"],
+        {
+            "role": "tool",
+            "content": f"Performed search: {compact_search_results(search_results)}",
+            "tool_call_id": tool_call_id
+        }
+    ]
+
+    # The extracted resources are cached for identical extraction calls
+    cache_key = None
+    resources = None
+    if llm_cache_enabled("perform_search"):
+        cache_key = make_key(model, messages, [EXTRACT_RESOURCES_TOOL])
+        resources = await llm_cache_get("perform_search", cache_key)
+
+    if resources is None:
+        response = await copilotkit_stream(
+            completion(
+                model=model,
+                messages=messages,
+                tools=[EXTRACT_RESOURCES_TOOL],
+                tool_choice="required",
+                parallel_tool_calls=False,
+                stream=True
+            )
         )
-    )
+        message = cast(Any, response).choices[0]["message"]
+        resources = json.loads(message["tool_calls"][0]["function"]["arguments"])["resources"]
+        if cache_key is not None:
+            await llm_cache_put("perform_search", cache_key, resources)
 
     state["logs"] = []
     # Use the prepared state for serialization
     serializable_state = prepare_state_for_serialization(state)
     await copilotkit_emit_state(serializable_state)
 
-    message = cast(Any, response).choices[0]["message"]
-    resources = json.loads(message["tool_calls"][0]["function"]["arguments"])["resources"]
-
     state["resources"].extend(resources)
 
     state["messages"].append({
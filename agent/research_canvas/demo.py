@@ -7,27 +7,34 @@ load_dotenv()
 # pylint: disable=wrong-import-position
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
 import traceback
 import json
 import time
+import asyncio
 
-# 首先导入model_config，这样其他模块在导入时可以使用它
-from research_canvas.langgraph.model_config import set_current_model, get_current_model
-
-# 从环境变量获取默认模型
+# 从环境变量获取默认模型（每个请求各自选择模型，不再修改全局状态）
 default_model = os.getenv("MODEL", "openai")
 print(f"Default model from environment: {default_model}")
 
-# 设置默认模型
-set_current_model(default_model)
-
-# 然后导入其他模块
 from copilotkit.integrations.fastapi import add_fastapi_endpoint
 from copilotkit import CopilotKitRemoteEndpoint, LangGraphAgent
 from copilotkit.crewai import CrewAIAgent
 from research_canvas.crewai.agent import ResearchCanvasFlow
-from research_canvas.langgraph.agent import graph, create_graph_with_model
+from research_canvas.langgraph.agent import graph, create_graph_with_model, checkpointer
+from research_canvas.langgraph.checkpointer import close_checkpointer
+from research_canvas.langgraph.retention import checkpoint_stats, run_compactor
+from research_canvas.http_session import close_session
+from research_canvas.cache import RESOURCE_CACHE
+from research_canvas.downloader import warm_up, read_warm_up_urls, CIRCUIT_BREAKER
+from research_canvas.convert import CONVERSION_STATS, shutdown_pool
+from research_canvas.searcher import search_stats
+from research_canvas.langgraph.prompt import PROMPT_CACHE_STATS
+from research_canvas.langgraph.fast_path import FAST_PATH_STATS
+from research_canvas.llm_cache import (
+    cached_ainvoke, chat_cache_key, get_cached_message, cache_message, llm_cache_stats
+)
 
 # from contextlib import asynccontextmanager
 # from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
@@ -104,6 +111,85 @@ sdk = CopilotKitRemoteEndpoint(
 # 先使用CopilotKit的add_fastapi_endpoint函数注册端点
 add_fastapi_endpoint(app, sdk, "/copilotkit")
 
+def _text(content) -> str:
+    """把消息内容（字符串或内容块列表）转换为纯文本"""
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") if isinstance(block, dict) else str(block)
+        for block in content
+    )
+
+def _usage(usage_metadata) -> dict:
+    """把LangChain的usage_metadata转换为OpenAI的usage格式"""
+    usage_metadata = usage_metadata or {}
+    prompt_tokens = usage_metadata.get("input_tokens", 0)
+    completion_tokens = usage_metadata.get("output_tokens", 0)
+    input_token_details = usage_metadata.get("input_token_details") or {}
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": usage_metadata.get("total_tokens", prompt_tokens + completion_tokens),
+        # 命中提供商提示缓存的输入token数
+        "prompt_tokens_details": {"cached_tokens": input_token_details.get("cache_read") or 0},
+    }
+
+def _chunk(response_id: str, created: int, model_name: str, delta, finish_reason) -> dict:
+    """构造一个chat.completion.chunk；delta为None时不包含choices（用于usage块）"""
+    return {
+        "id": response_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model_name,
+        "choices": [] if delta is None else [
+            {"index": 0, "delta": delta, "finish_reason": finish_reason}
+        ],
+    }
+
+async def _sse(chunks):
+    """把chunk列表编码为SSE事件"""
+    for chunk in chunks:
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+async def _stream_completion(model, lc_messages, response_id: str, created: int, model_name: str,
+                             cache_key=None):
+    """异步流式调用模型，并把每个token块作为SSE事件发送；完整的回复写入LLM响应缓存"""
+    stream_kwargs = {}
+    if model.__class__.__name__ in ["ChatOpenAI"]:
+        # OpenAI只有在请求时才会在流的最后返回token用量
+        stream_kwargs["stream_usage"] = True
+
+    full = None
+    role_sent = False
+    try:
+        async for message_chunk in model.astream(lc_messages, **stream_kwargs):
+            full = message_chunk if full is None else full + message_chunk
+            text = _text(message_chunk.content)
+            if not text and role_sent:
+                continue
+            delta = {"content": text}
+            if not role_sent:
+                delta["role"] = "assistant"
+                role_sent = True
+            yield f"data: {json.dumps(_chunk(response_id, created, model_name, delta, None))}\n\n"
+        finish = _chunk(response_id, created, model_name, {}, "stop")
+        if full is not None:
+            await cache_message("copilotkit", cache_key, full)
+    except Exception as e: # pylint: disable=broad-except
+        # 响应头已经发出，只能记录错误并结束流
+        print(f"Error while streaming in custom_copilotkit_handler: {str(e)}")
+        print(traceback.format_exc())
+        finish = _chunk(response_id, created, model_name, {}, "error")
+
+    usage_chunk = {
+        **_chunk(response_id, created, model_name, None, None),
+        "usage": _usage(full.usage_metadata if full is not None else None),
+    }
+    yield f"data: {json.dumps(finish)}\n\n"
+    yield f"data: {json.dumps(usage_chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
 # 然后用我们自己的端点覆盖它
 @app.post("/copilotkit")
 async def custom_copilotkit_handler(request: Request):
@@ -120,6 +206,7 @@ async def custom_copilotkit_handler(request: Request):
         agent_name = data.get("agent", "research_agent")
         tools = data.get("tools", [])  # 获取工具定义
         tool_choice = data.get("tool_choice", "auto")  # 工具选择
+        stream = data.get("stream", False)  # 与OpenAI一致：只有请求中指定stream时才以SSE流式返回
         
         # 判断是否需要执行工具调用
         need_tool_call = (tool_choice != "none" and len(tools) > 0)
@@ -147,27 +234,46 @@ async def custom_copilotkit_handler(request: Request):
         if not lc_messages:
             return {"error": "No valid messages received"}
         
-        # 临时设置当前模型（确保在当前请求中使用正确的模型）
-        current_model = get_current_model()
-        set_current_model(model_name)
-        
         try:
-            # 创建状态
-            state = AgentState({})
+            # 创建状态（模型只对当前请求生效）
+            state = AgentState({"model": model_name})
             
             # 获取模型
             model = get_model(state)
             
-            # 调用模型
-            ai_response = model.invoke(lc_messages)
+            response_id = f"response-{agent_name}"
+            created = int(time.time())
             
             # 确定是返回普通消息还是工具调用
             if need_tool_call and "search" in [tool.get("function", {}).get("name") for tool in tools]:
                 # 模拟工具调用 - 这里我们创建一个search工具调用
+                # 这个回复不依赖模型输出，所以不需要调用模型
+                tool_call = {
+                    "id": f"call-search-{created}",
+                    "type": "function",
+                    "function": {
+                        "name": "search",
+                        "arguments": json.dumps({
+                            "query": lc_messages[-1].content  # 使用最后一条用户消息作为搜索查询
+                        })
+                    }
+                }
+                usage = _usage(None)
+                if stream:
+                    return StreamingResponse(
+                        _sse([
+                            _chunk(response_id, created, model_name,
+                                   {"role": "assistant", "content": None,
+                                    "tool_calls": [{"index": 0, **tool_call}]},
+                                   "tool_calls"),
+                            {**_chunk(response_id, created, model_name, None, None), "usage": usage},
+                        ]),
+                        media_type="text/event-stream"
+                    )
                 response_data = {
-                    "id": f"response-{agent_name}",
+                    "id": response_id,
                     "object": "chat.completion",
-                    "created": int(time.time()),
+                    "created": created,
                     "model": model_name,
                     "choices": [
                         {
@@ -175,63 +281,57 @@ async def custom_copilotkit_handler(request: Request):
                             "message": {
                                 "role": "assistant",
                                 "content": None,  # 当有工具调用时，content为null
-                                "tool_calls": [
-                                    {
-                                        "id": f"call-search-{int(time.time())}",
-                                        "type": "function",
-                                        "function": {
-                                            "name": "search",
-                                            "arguments": json.dumps({
-                                                "query": lc_messages[-1].content  # 使用最后一条用户消息作为搜索查询
-                                            })
-                                        }
-                                    }
-                                ]
+                                "tool_calls": [tool_call]
                             },
                             "finish_reason": "tool_calls"
                         }
                     ],
-                    "usage": {
-                        "prompt_tokens": 0,
-                        "completion_tokens": 0,
-                        "total_tokens": 0
-                    }
+                    "usage": usage
                 }
+            elif stream:
+                cache_key = chat_cache_key("copilotkit", model, lc_messages)
+                cached = await get_cached_message("copilotkit", cache_key)
+                if cached is not None:
+                    # 缓存命中：整个回复作为一个块返回
+                    return StreamingResponse(
+                        _sse([
+                            _chunk(response_id, created, model_name,
+                                   {"role": "assistant", "content": _text(cached.content)}, None),
+                            _chunk(response_id, created, model_name, {}, "stop"),
+                            {**_chunk(response_id, created, model_name, None, None), "usage": _usage(None)},
+                        ]),
+                        media_type="text/event-stream"
+                    )
+                # 以SSE流的形式逐个返回token（OpenAI chat.completion.chunk格式）
+                return StreamingResponse(
+                    _stream_completion(model, lc_messages, response_id, created, model_name, cache_key),
+                    media_type="text/event-stream"
+                )
             else:
-                # 返回普通消息
+                # 返回普通消息（相同的请求可以从LLM响应缓存返回）
+                ai_response = await cached_ainvoke("copilotkit", model, lc_messages)
                 response_data = {
-                    "id": f"response-{agent_name}",
+                    "id": response_id,
                     "object": "chat.completion",
-                    "created": int(time.time()),
+                    "created": created,
                     "model": model_name,
                     "choices": [
                         {
                             "index": 0,
                             "message": {
                                 "role": "assistant",
-                                "content": ai_response.content,
+                                "content": _text(ai_response.content),
                             },
                             "finish_reason": "stop"
                         }
                     ],
-                    "usage": {
-                        "prompt_tokens": 0,
-                        "completion_tokens": 0,
-                        "total_tokens": 0
-                    }
+                    "usage": _usage(ai_response.usage_metadata)
                 }
             
-            # 恢复原来的模型设置
-            if current_model:
-                set_current_model(current_model)
-                
             # 使用JSONResponse以确保正确的Content-Type
-            from fastapi.responses import JSONResponse
             return JSONResponse(content=response_data)
             
         except Exception as e:
-            if current_model:
-                set_current_model(current_model)
             print(f"Error in custom_copilotkit_handler: {str(e)}")
             print(traceback.format_exc())
             raise HTTPException(status_code=500, detail=str(e))
@@ -254,8 +354,16 @@ async def log_requests(request: Request, call_next):
         body_bytes = await request.body()
         
         # 为了能够多次读取请求体，我们需要修改request._receive
+        # 请求体只返回一次，之后交给原来的receive，这样流式响应仍能检测到客户端断开
+        original_receive = request._receive
+        body_returned = False
+
         async def receive():
-            return {"type": "http.request", "body": body_bytes}
+            nonlocal body_returned
+            if not body_returned:
+                body_returned = True
+                return {"type": "http.request", "body": body_bytes, "more_body": False}
+            return await original_receive()
         
         request._receive = receive
         
@@ -293,6 +401,47 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics():
+    """Cache and pipeline counters."""
+    return {
+        "resource_cache": RESOURCE_CACHE.stats(),
+        "conversion": CONVERSION_STATS.as_dict(),
+        "open_circuits": CIRCUIT_BREAKER.open_hosts(),
+        "search_cache": search_stats(),
+        "prompt_cache": PROMPT_CACHE_STATS.as_dict(),
+        "llm_cache": llm_cache_stats(),
+        "fast_path": FAST_PATH_STATS.as_dict(),
+    }
+
+
+@app.get("/checkpoints")
+async def checkpoints():
+    """Checkpoint count and bytes per thread."""
+    return await checkpoint_stats(checkpointer)
+
+
+@app.on_event("startup")
+async def startup():
+    """Start the checkpoint compactor and warm up the resource cache from
+    RESOURCE_WARMUP_FILE in the background."""
+    app.state.compactor_task = asyncio.create_task(run_compactor(checkpointer))
+    warm_up_file = os.getenv("RESOURCE_WARMUP_FILE")
+    if warm_up_file:
+        app.state.warm_up_task = asyncio.create_task(
+            warm_up(read_warm_up_urls(warm_up_file))
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the shared download session, the conversion pool and the checkpointer."""
+    app.state.compactor_task.cancel()
+    await close_session()
+    shutdown_pool()
+    await close_checkpointer(checkpointer)
+
+
 @app.post("/gemini")
 async def gemini_endpoint(request: Request):
     data = await request.json()
@@ -312,12 +461,12 @@ async def test_gemini(request: Request):
         from langchain_core.messages import HumanMessage
         
         # 创建一个包含model=google_genai的状态
-        state = AgentState({})
+        state = AgentState({"model": "google_genai"})
         # 获取Google Gemini模型
         model = get_model(state)
         
-        # 调用模型
-        response = model.invoke([HumanMessage(content=query)])
+        # 调用模型（相同的请求可以从LLM响应缓存返回）
+        response = await cached_ainvoke("test_gemini", model, [HumanMessage(content=query)])
         
         return {"response": response.content}
     except Exception as e:
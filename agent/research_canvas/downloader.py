@@ -0,0 +1,385 @@
+"""
+Resource downloader shared by the langgraph and crewai agents.
+
+Converted content is looked up in the in-memory RESOURCE_CACHE first and then
+in the optional on-disk CONTENT_STORE, which is shared by all workers on a host.
+"""
+
+import os
+import re
+import time
+import codecs
+import random
+import asyncio
+import threading
+from typing import Dict, List, Optional, Tuple, TypedDict
+from urllib.parse import urlsplit
+import aiohttp
+from research_canvas.http_session import get_session
+from research_canvas.convert import html_to_markdown
+from research_canvas.cache import RESOURCE_CACHE as _RESOURCE_CACHE
+from research_canvas.content_store import CONTENT_STORE
+from research_canvas.retrieval import PASSAGE_INDEX
+
+# Maximum number of resources downloaded in parallel
+DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", "8"))
+# Bodies are cut off after this many bytes
+RESOURCE_MAX_BYTES = int(os.getenv("RESOURCE_MAX_BYTES", str(2 * 1024 * 1024)))
+# Failed downloads are remembered for this long before they are retried
+RESOURCE_ERROR_TTL = float(os.getenv("RESOURCE_ERROR_TTL", "60"))
+# Extra attempts for transient failures, with exponential backoff
+RESOURCE_RETRIES = int(os.getenv("RESOURCE_RETRIES", "2"))
+RESOURCE_RETRY_BACKOFF = float(os.getenv("RESOURCE_RETRY_BACKOFF", "0.5"))
+# Consecutive transient failures after which a host is skipped for the cooldown
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "3"))
+CIRCUIT_BREAKER_COOLDOWN = float(os.getenv("CIRCUIT_BREAKER_COOLDOWN", "300"))
+
+_CHUNK_SIZE = 64 * 1024
+# Bytes charged per cache entry on top of its text, so that failed downloads
+# (which have no content) still count against the cache budget
+_ENTRY_OVERHEAD = 512
+_HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
+_TEXT_CONTENT_TYPES = _HTML_CONTENT_TYPES | {
+    "text/plain", "text/markdown", "text/xml", "application/xml"
+}
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([a-zA-Z0-9_-]+)""", re.IGNORECASE)
+
+class CachedResource(TypedDict):
+    """
+    A downloaded resource as it is kept in the cache.
+    """
+    content: str
+    content_type: str
+    truncated: bool
+    error: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+class UnsupportedContentType(Exception):
+    """
+    Raised when a URL does not return text.
+    """
+
+class CircuitOpen(Exception):
+    """
+    Raised when a host is skipped because it failed repeatedly.
+    """
+
+class HostCircuitBreaker:
+    """
+    Tracks consecutive failed downloads per host, each counted once its
+    retries are exhausted. After `threshold` failures the circuit opens and
+    requests to the host fail fast until `cooldown` has passed; then one
+    request is let through and either closes the circuit or opens it again.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures: Dict[str, int] = {}
+        self._open_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def check(self, host: str):
+        """
+        Raise CircuitOpen if the host is currently skipped.
+        """
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return
+            if open_until > time.monotonic():
+                raise CircuitOpen(f"Skipping {host} after repeated failures")
+            # half-open: let this request through, a failure reopens immediately
+            del self._open_until[host]
+            self._failures[host] = self.threshold - 1
+
+    def record_success(self, host: str):
+        """
+        Close the circuit of a host.
+        """
+        with self._lock:
+            self._failures.pop(host, None)
+            self._open_until.pop(host, None)
+
+    def record_failure(self, host: str):
+        """
+        Count a transient failure, opening the circuit at the threshold.
+        """
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if failures >= self.threshold:
+                self._open_until[host] = time.monotonic() + self.cooldown
+
+    def open_hosts(self) -> List[str]:
+        """
+        Get the hosts whose circuit is open.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [host for host, until in self._open_until.items() if until > now]
+
+CIRCUIT_BREAKER = HostCircuitBreaker(CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN)
+
+def get_resource(url: str):
+    """
+    Get a resource from the cache. Blocks on the on-disk store; async code
+    uses get_cached_resource.
+    """
+    entry = _memory_entry(url)
+    if entry is None and CONTENT_STORE is not None:
+        entry = _store_entry(url, CONTENT_STORE.get(url))
+    return entry["content"] if entry is not None else ""
+
+async def get_cached_resource(url: str) -> Optional[CachedResource]:
+    """
+    Get the cache entry of a resource, falling back to the on-disk store.
+    Failed downloads are cached too, with `error` set, until RESOURCE_ERROR_TTL.
+    """
+    entry = _memory_entry(url)
+    if entry is None and CONTENT_STORE is not None:
+        entry = _store_entry(url, await asyncio.to_thread(CONTENT_STORE.get, url))
+    return entry
+
+def _memory_entry(url: str) -> Optional[CachedResource]:
+    entry = _RESOURCE_CACHE.get(url)
+    if entry is None:
+        _drop_expired_error(url)
+    return entry
+
+def _store_entry(url: str, stored) -> Optional[CachedResource]:
+    if stored is None:
+        return None
+    entry = _from_store(stored)
+    _cache(url, entry)
+    return entry
+
+def _drop_expired_error(url: str):
+    # The cache keeps expired entries for revalidation, which failures can't
+    # use; drop them so failing URLs don't pile up
+    stale = _RESOURCE_CACHE.peek(url)
+    if stale is not None and stale["error"]:
+        _RESOURCE_CACHE.delete(url)
+
+def _from_store(stored) -> CachedResource:
+    metadata = stored["metadata"]
+    return CachedResource(
+        content=stored["content"],
+        content_type=metadata.get("content_type", ""),
+        truncated=metadata.get("truncated", False),
+        error=None,
+        etag=metadata.get("etag"),
+        last_modified=metadata.get("last_modified"),
+    )
+
+async def _get_stale_resource(url: str) -> Optional[CachedResource]:
+    """
+    Get an expired entry of a resource, to revalidate with the server if it
+    has an ETag or Last-Modified, and to fall back to if the download fails.
+    """
+    entry = _RESOURCE_CACHE.peek(url)
+    if entry is None and CONTENT_STORE is not None:
+        stored = await asyncio.to_thread(CONTENT_STORE.get, url, True)
+        if stored is not None:
+            entry = _from_store(stored)
+    if entry is None or entry["error"]:
+        return None
+    return entry
+
+def _cache(url: str, entry: CachedResource, ttl: Optional[float] = None):
+    size = len(url) + len(entry["content"].encode("utf-8")) + len(entry["error"] or "")
+    _RESOURCE_CACHE.set(url, entry, size=size + _ENTRY_OVERHEAD, ttl=ttl)
+
+def _sniff_charset(first_chunk: bytes) -> Optional[str]:
+    """
+    Detect the charset of a document from its first chunk (BOM or <meta> tag).
+    """
+    if first_chunk.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if first_chunk.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    match = _META_CHARSET.search(first_chunk[:4096])
+    return match.group(1).decode("ascii") if match else None
+
+def _check_content_type(response: aiohttp.ClientResponse) -> str:
+    """
+    Fail fast on responses that are not text, before reading the body.
+    """
+    if "Content-Type" not in response.headers:
+        return ""
+    content_type = response.content_type
+    if content_type not in _TEXT_CONTENT_TYPES:
+        raise UnsupportedContentType(f"Unsupported content type: {content_type}")
+    return content_type
+
+async def _read_text(response: aiohttp.ClientResponse) -> Tuple[str, bool]:
+    """
+    Stream the body, decoding it incrementally and stopping at RESOURCE_MAX_BYTES.
+    Returns the text and whether it was truncated.
+    """
+    decoder = None
+    parts = []
+    received = 0
+    truncated = False
+    async for chunk in response.content.iter_chunked(_CHUNK_SIZE):
+        if decoder is None:
+            if b"\x00" in chunk[:1024] and not chunk.startswith(
+                (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+            ):
+                raise UnsupportedContentType("Binary content")
+            charset = response.charset or _sniff_charset(chunk) or "utf-8"
+            try:
+                decoder = codecs.getincrementaldecoder(charset)(errors="replace")
+            except LookupError:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        if received + len(chunk) > RESOURCE_MAX_BYTES:
+            chunk = chunk[:RESOURCE_MAX_BYTES - received]
+            truncated = True
+        received += len(chunk)
+        parts.append(decoder.decode(chunk))
+        if truncated:
+            break
+    if decoder is not None:
+        parts.append(decoder.decode(b"", final=True))
+    return "".join(parts), truncated
+
+def _is_transient(error: Exception) -> bool:
+    """
+    Whether a failure is worth retrying (and counts against the host).
+    """
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+async def _fetch(url: str, stale: Optional[CachedResource]) -> Tuple[CachedResource, int]:
+    """
+    Fetch and convert a resource. If a stale entry with validators is given,
+    the request is conditional and a 304 Not Modified reuses its already
+    converted content.
+    """
+    headers = {}
+    if stale is not None:
+        if stale["etag"]:
+            headers["If-None-Match"] = stale["etag"]
+        if stale["last_modified"]:
+            headers["If-Modified-Since"] = stale["last_modified"]
+
+    async with get_session().get(url, headers=headers) as response:
+        response.raise_for_status()
+        status = response.status
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if status == 304 and stale is not None:
+            return CachedResource(
+                **{
+                    **stale,
+                    "etag": etag or stale["etag"],
+                    "last_modified": last_modified or stale["last_modified"],
+                }
+            ), status
+        content_type = _check_content_type(response)
+        text, truncated = await _read_text(response)
+
+    if content_type in _HTML_CONTENT_TYPES or not content_type:
+        content = await html_to_markdown(text)
+    else:
+        content = text
+    return CachedResource(
+        content=content,
+        content_type=content_type,
+        truncated=truncated,
+        error=None,
+        etag=etag,
+        last_modified=last_modified,
+    ), status
+
+async def download_resource(url: str):
+    """
+    Download a resource from the internet asynchronously.
+    Expired resources with an ETag or Last-Modified are revalidated.
+    Transient failures are retried with exponential backoff; failures are
+    cached for RESOURCE_ERROR_TTL so they are retried on a later turn. If an
+    expired copy exists, it is served for that time instead of the error.
+    """
+    host = urlsplit(url).hostname or ""
+    stale = await _get_stale_resource(url)
+    attempt = 0
+    while True:
+        try:
+            CIRCUIT_BREAKER.check(host)
+            entry, status = await _fetch(url, stale)
+            CIRCUIT_BREAKER.record_success(host)
+            break
+        except Exception as e: # pylint: disable=broad-except
+            transient = _is_transient(e)
+            if transient and attempt < RESOURCE_RETRIES:
+                delay = RESOURCE_RETRY_BACKOFF * 2 ** attempt
+                await asyncio.sleep(delay + random.uniform(0, delay))
+                attempt += 1
+                continue
+            # One failure per download, not per attempt, so that a single
+            # dead URL can't open the circuit for its whole host
+            if transient:
+                CIRCUIT_BREAKER.record_failure(host)
+            error = str(e) or e.__class__.__name__
+            if stale is not None:
+                # Keep the content and validators through an upstream outage
+                _cache(url, stale, ttl=RESOURCE_ERROR_TTL)
+                return stale["content"]
+            _cache(
+                url,
+                CachedResource(
+                    content="",
+                    content_type="",
+                    truncated=False,
+                    error=error,
+                    etag=None,
+                    last_modified=None,
+                ),
+                ttl=RESOURCE_ERROR_TTL
+            )
+            return f"Error downloading resource: {error}"
+
+    _cache(url, entry)
+    await asyncio.to_thread(PASSAGE_INDEX.ensure, url, entry["content"])
+    if CONTENT_STORE is not None and status == 304:
+        await asyncio.to_thread(CONTENT_STORE.touch, url)
+    elif CONTENT_STORE is not None:
+        await asyncio.to_thread(
+            CONTENT_STORE.put,
+            url,
+            entry["content"],
+            {
+                "status": status,
+                "content_type": entry["content_type"],
+                "truncated": entry["truncated"],
+                "etag": entry["etag"],
+                "last_modified": entry["last_modified"],
+            }
+        )
+    return entry["content"]
+
+async def warm_up(urls: List[str]):
+    """
+    Download every URL that is not cached yet, e.g. popular pages at startup.
+    """
+    semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+
+    async def download(url: str):
+        async with semaphore:
+            if await get_cached_resource(url) is None:
+                await download_resource(url)
+
+    await asyncio.gather(*(download(url) for url in urls))
+    print(f"Warmed up resource cache with {len(urls)} URLs")
+
+def read_warm_up_urls(path: str) -> List[str]:
+    """
+    Read a URL list file: one URL per line, blank lines and #-comments ignored.
+    """
+    with open(path, encoding="utf-8") as f:
+        return [
+            line.strip() for line in f
+            if line.strip() and not line.strip().startswith("#")
+        ]
@@ -0,0 +1,55 @@
+"""
+Shared, app-scoped aiohttp session used to download resources.
+
+Creating a ClientSession per URL throws away the connection pool, so every
+download pays for DNS resolution and the TCP/TLS handshake again. Instead we
+keep one session per event loop with keep-alive, DNS caching and per-host
+connection limits.
+"""
+
+import os
+import asyncio
+import aiohttp
+
+_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3" # pylint: disable=line-too-long
+
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "8"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+
+# A ClientSession is bound to the loop it was created on, so keep one per loop.
+_SESSIONS = {}
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Get the shared session for the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    session = _SESSIONS.get(loop)
+    if session is None or session.closed:
+        # Forget sessions whose loop is gone (e.g. short-lived asyncio.run loops)
+        for stale_loop in [l for l in _SESSIONS if l.is_closed()]:
+            del _SESSIONS[stale_loop]
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_POOL_LIMIT,
+            limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        )
+        session = aiohttp.ClientSession(
+            connector=connector,
+            headers={"User-Agent": _USER_AGENT},
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+        )
+        _SESSIONS[loop] = session
+    return session
+
+async def close_session():
+    """
+    Close the shared session of the running event loop, if any.
+    """
+    session = _SESSIONS.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
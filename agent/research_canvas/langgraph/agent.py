@@ -4,46 +4,60 @@ It defines the workflow graph and the entry point for the agent.
 """
 # pylint: disable=line-too-long, unused-import
 import json
+import functools
 from typing import cast, Dict, Any
 
 from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
 from research_canvas.langgraph.state import AgentState
 from research_canvas.langgraph.download import download_node
 from research_canvas.langgraph.chat import chat_node
 from research_canvas.langgraph.search import search_node
 from research_canvas.langgraph.delete import delete_node, perform_delete_node
-from research_canvas.langgraph.model_config import set_current_model
+from research_canvas.langgraph.checkpointer import create_checkpointer
+from research_canvas.langgraph.model_config import use_model
 
-# Define a new graph
-workflow = StateGraph(AgentState)
-workflow.add_node("download", download_node)
-workflow.add_node("chat_node", chat_node)
-workflow.add_node("search_node", search_node)
-workflow.add_node("delete_node", delete_node)
-workflow.add_node("perform_delete_node", perform_delete_node)
+_NODES = {
+    "download": download_node,
+    "chat_node": chat_node,
+    "search_node": search_node,
+    "delete_node": delete_node,
+    "perform_delete_node": perform_delete_node,
+}
+
+def _with_model(node, model_name):
+    """让节点在指定模型的上下文中运行（运行配置或状态中的模型仍然优先）"""
+    @functools.wraps(node)
+    async def node_with_model(state: AgentState, config: RunnableConfig):
+        with use_model(model_name):
+            return await node(state, config)
+    return node_with_model
 
+def _build_workflow(model_name=None):
+    """构建工作流，指定model_name时所有节点都使用该模型"""
+    builder = StateGraph(AgentState)
+    for name, node in _NODES.items():
+        builder.add_node(name, _with_model(node, model_name) if model_name else node)
+    builder.set_entry_point("download")
+    builder.add_edge("download", "chat_node")
+    builder.add_edge("delete_node", "perform_delete_node")
+    builder.add_edge("perform_delete_node", "chat_node")
+    builder.add_edge("search_node", "download")
+    return builder
+
+# Define a new graph
+workflow = _build_workflow()
 
-memory = MemorySaver()
-workflow.set_entry_point("download")
-workflow.add_edge("download", "chat_node")
-workflow.add_edge("delete_node", "perform_delete_node")
-workflow.add_edge("perform_delete_node", "chat_node")
-workflow.add_edge("search_node", "download")
-graph = workflow.compile(checkpointer=memory, interrupt_after=["delete_node"])
+checkpointer = create_checkpointer()
+graph = workflow.compile(checkpointer=checkpointer, interrupt_after=["delete_node"])
 
 # 自定义的graph调用函数，支持model_name参数
 def create_graph_with_model(model_name=None):
     """创建一个新的graph实例，支持model_name参数"""
-    # 如果指定了model_name，设置为当前模型
-    if model_name:
-        set_current_model(model_name)
-    
-    # 编译graph
-    compiled_graph = workflow.compile(
-        checkpointer=memory, 
+    # 模型绑定在节点上而不是graph的运行配置中：LangGraph会用每次调用的
+    # configurable整体替换graph.with_config设置的configurable，节点收不到它
+    return _build_workflow(model_name).compile(
+        checkpointer=checkpointer,
         interrupt_after=["delete_node"]
     )
-    
-    return compiled_graph
@@ -0,0 +1,87 @@
+"""
+Campaign bookkeeping for the chat node.
+
+Campaigns are kept in state["campaigns_by_id"], keyed by id, so the tools
+look up, update and delete them without scanning. state["campaigns"] stays
+the list the UI renders and edits; it is rebuilt from the mapping whenever a
+tool changes it, and campaigns the UI added, removed or edited are picked up
+from it before the tools run.
+"""
+
+import re
+from typing import Any, Dict, List, Optional
+from research_canvas.langgraph.state import AgentState, Campaign
+
+# Characters of a campaign brief shown in the prompt summary
+_BRIEF_PREVIEW_CHARS = 120
+
+def campaign_index(state: AgentState) -> Dict[str, Campaign]:
+    """
+    Get the campaigns by id, taking in changes the UI made to the list.
+    """
+    by_id = state.get("campaigns_by_id") or {}
+    listed = state.get("campaigns") or []
+    # The UI may send back only some of the fields, so its entries are merged
+    # over the stored ones rather than replacing them
+    if listed != campaign_list(by_id):
+        by_id = {
+            campaign["id"]: {**by_id.get(campaign["id"], {}), **campaign}
+            for campaign in listed
+        }
+    return by_id
+
+def campaign_list(by_id: Dict[str, Campaign]) -> List[Campaign]:
+    """
+    Get the campaigns as the list shown by the UI.
+    """
+    return list(by_id.values())
+
+def target_campaign(
+    by_id: Dict[str, Campaign],
+    campaign_id: str = "",
+    current_campaign_id: str = ""
+) -> Optional[Campaign]:
+    """
+    Get the campaign a customization applies to: the given one, the current
+    one, or else the most recently created one.
+    """
+    for candidate in (campaign_id, current_campaign_id):
+        if candidate and candidate in by_id:
+            return by_id[candidate]
+    return by_id[next(reversed(by_id))] if by_id else None
+
+def parse_channels(channels: Any) -> List[str]:
+    """
+    Split a channel description like "Instagram, email and search ads".
+    """
+    if isinstance(channels, list):
+        return [str(channel).strip() for channel in channels if str(channel).strip()]
+    return [
+        channel.strip() for channel in re.split(r",|;|\band\b|\n", str(channels))
+        if channel.strip()
+    ]
+
+def summarize_campaigns(by_id: Dict[str, Campaign]) -> str:
+    """
+    Render the campaigns as one compact line each for the prompt.
+    """
+    lines = []
+    for campaign in by_id.values():
+        fields = [f'{campaign["id"]}: "{campaign["title"]}" ({campaign.get("status", "draft")})']
+        if campaign.get("goals"):
+            fields.append(f'goals: {campaign["goals"]}')
+        audience = campaign.get("audience") or {}
+        if audience:
+            fields.append("audience: " + ", ".join(
+                value for value in (audience.get("description"), audience.get("age_range")) if value
+            ))
+        if campaign.get("channels"):
+            fields.append("channels: " + ", ".join(campaign["channels"]))
+        if campaign.get("budget"):
+            fields.append(f'budget: {campaign["budget"]}')
+        brief = campaign.get("brief") or ""
+        if brief:
+            preview = brief if len(brief) <= _BRIEF_PREVIEW_CHARS else brief[:_BRIEF_PREVIEW_CHARS] + "..."
+            fields.append(f"brief: {preview}")
+        lines.append("- " + "; ".join(fields))
+    return "\n".join(lines) if lines else "(none)"
@@ -1,14 +1,20 @@
 """Chat Node"""
 
-from typing import List, Dict, Any, cast, Literal
+from typing import Callable, List, Dict, Any, Optional, cast, Literal
 from langchain_core.runnables import RunnableConfig
-from langchain_core.messages import SystemMessage, AIMessage, ToolMessage
+from langchain_core.messages import AIMessage, ToolMessage, HumanMessage
 from langchain.tools import tool
 from langgraph.types import Command
 from copilotkit.langgraph import copilotkit_customize_config
-from research_canvas.langgraph.state import AgentState
-from research_canvas.langgraph.model import get_model
-from research_canvas.langgraph.download import get_resource
+from research_canvas.langgraph.state import AgentState, Audience, Campaign
+from research_canvas.langgraph.campaigns import (
+    campaign_index, campaign_list, target_campaign, parse_channels
+)
+from research_canvas.langgraph.model import get_model, bind_tools_cached
+from research_canvas.langgraph.download import get_cached_resource
+from research_canvas.langgraph.prompt import build_system_message, PROMPT_CACHE_STATS
+from research_canvas.langgraph.history import fit_history
+from research_canvas.langgraph.fast_path import menu_choice, fast_path_reply, has_text, FAST_PATH_STATS
 import uuid
 import datetime
 
@@ -46,24 +52,176 @@ def JustBrowsing(): # pylint: disable=invalid-name,unused-argument
     """User chooses to just browse, not create a new campaign. Reply to confirm they can freely browse and ask for help anytime."""
 
 @tool
-def DefineTargetAudience(audience_description: str, age_range: str = ""): # pylint: disable=invalid-name,unused-argument
-    """Define the target audience for the marketing campaign. Can include age range information."""
+def DefineTargetAudience(audience_description: str, age_range: str = "", campaign_id: str = ""): # pylint: disable=invalid-name,unused-argument
+    """Define the target audience for the marketing campaign. Can include age range information. Defaults to the current campaign."""
 
 @tool
-def SelectAgeRange(age_range: str): # pylint: disable=invalid-name,unused-argument
-    """Select the target audience age range, such as: '18-24', '25-34', '35-44', '45-54', '55+'."""
+def SelectAgeRange(age_range: str, campaign_id: str = ""): # pylint: disable=invalid-name,unused-argument
+    """Select the target audience age range, such as: '18-24', '25-34', '35-44', '45-54', '55+'. Defaults to the current campaign."""
 
 @tool
-def SetCampaignGoals(goals: str): # pylint: disable=invalid-name,unused-argument
-    """Set the goals for the marketing campaign."""
+def SetCampaignGoals(goals: str, campaign_id: str = ""): # pylint: disable=invalid-name,unused-argument
+    """Set the goals for the marketing campaign. Defaults to the current campaign."""
 
 @tool
-def SelectMarketingChannels(channels: str): # pylint: disable=invalid-name,unused-argument
-    """Select the channels for the marketing campaign."""
+def SelectMarketingChannels(channels: str, campaign_id: str = ""): # pylint: disable=invalid-name,unused-argument
+    """Select the channels for the marketing campaign. Defaults to the current campaign."""
 
 @tool
-def SetCampaignBudget(budget: str): # pylint: disable=invalid-name,unused-argument
-    """Set the budget for the marketing campaign."""
+def SetCampaignBudget(budget: str, campaign_id: str = ""): # pylint: disable=invalid-name,unused-argument
+    """Set the budget for the marketing campaign. Defaults to the current campaign."""
+
+CHAT_TOOLS = [
+    Search,
+    WriteCampaign,
+    WriteCampaignBrief,
+    CreateCampaign,
+    DeleteCampaign,
+    DeleteResources,
+    CreateNewCampaign,
+    JustBrowsing,
+    DefineTargetAudience,
+    SelectAgeRange,
+    SetCampaignGoals,
+    SelectMarketingChannels,
+    SetCampaignBudget,
+]
+
+# Tools handled by other nodes, and the node that handles them
+ROUTED_TOOLS = {
+    "Search": "search_node",
+    "DeleteResources": "delete_node",
+}
+
+# The handlers below apply a tool call to the state update of a chat_node
+# pass and return the content of its ToolMessage. Earlier calls of the same
+# pass are already in `update`.
+
+def _current(state: AgentState, update: Dict[str, Any], key: str, default: Any) -> Any:
+    return update[key] if key in update else state.get(key, default)
+
+def _campaigns(state: AgentState, update: Dict[str, Any]) -> Dict[str, Campaign]:
+    """
+    Get the campaigns by id for this pass, copied on first use so that the
+    handlers can change them in place.
+    """
+    if "campaigns_by_id" not in update:
+        update["campaigns_by_id"] = dict(campaign_index(state))
+    return update["campaigns_by_id"]
+
+def _update_campaign(state: AgentState, update: Dict[str, Any], args: Dict[str, Any], **fields) -> Optional[Campaign]:
+    """
+    Update fields of the campaign a customization tool applies to.
+    """
+    campaigns = _campaigns(state, update)
+    campaign = target_campaign(
+        campaigns,
+        args.get("campaign_id", ""),
+        _current(state, update, "current_campaign_id", "")
+    )
+    if campaign is None:
+        return None
+    campaign = {**campaign, **fields}
+    campaigns[campaign["id"]] = campaign
+    update["campaigns"] = campaign_list(campaigns)
+    return campaign
+
+def _write_campaign(state: AgentState, update: Dict[str, Any], args: Dict[str, Any]) -> str: # pylint: disable=unused-argument
+    update["report"] = args.get("report", "")
+    return "Campaign draft written."
+
+def _write_campaign_brief(state: AgentState, update: Dict[str, Any], args: Dict[str, Any]) -> str: # pylint: disable=unused-argument
+    update["campaign_brief"] = args["campaign_brief"]
+    return "Campaign brief written."
+
+def _create_campaign(state: AgentState, update: Dict[str, Any], args: Dict[str, Any]) -> str:
+    title = args["title"]
+    new_campaign: Campaign = {
+        "id": str(uuid.uuid4()),
+        "title": title,
+        "status": args.get("status", "draft"),
+        "brief": _current(state, update, "campaign_brief", ""),
+        "createdAt": datetime.datetime.now().isoformat()
+    }
+    campaigns = _campaigns(state, update)
+    campaigns[new_campaign["id"]] = new_campaign
+    update["campaigns"] = campaign_list(campaigns)
+    update["current_campaign_id"] = new_campaign["id"]
+    return f"New campaign '{title}' created successfully."
+
+def _delete_campaign(state: AgentState, update: Dict[str, Any], args: Dict[str, Any]) -> str:
+    campaign_id = args["campaign_id"]
+    confirmation_title = args["confirmation_title"]
+    campaigns = _campaigns(state, update)
+    campaign_to_delete = campaigns.get(campaign_id)
+    if campaign_to_delete and campaign_to_delete["title"] == confirmation_title:
+        del campaigns[campaign_id]
+        update["campaigns"] = campaign_list(campaigns)
+        if _current(state, update, "current_campaign_id", "") == campaign_id:
+            update["current_campaign_id"] = ""
+        return f"Campaign '{confirmation_title}' deleted successfully."
+    # Incorrect confirmation or campaign not found
+    return "Cannot delete campaign. Either the campaign was not found or the confirmation title doesn't match."
+
+def _create_new_campaign(state: AgentState, update: Dict[str, Any], args: Dict[str, Any]) -> str: # pylint: disable=unused-argument
+    return "Let's create a new marketing campaign. What would you like to name it?"
+
+def _just_browsing(state: AgentState, update: Dict[str, Any], args: Dict[str, Any]) -> str: # pylint: disable=unused-argument
+    return "No problem! Feel free to browse. Let me know if you need any help."
+
+def _define_target_audience(state: AgentState, update: Dict[str, Any], args: Dict[str, Any]) -> str:
+    campaign = target_campaign(
+        _campaigns(state, update),
+        args.get("campaign_id", ""),
+        _current(state, update, "current_campaign_id", "")
+    )
+    if campaign is not None:
+        # Keep an age range selected before unless a new one is given
+        audience: Audience = {
+            **(campaign.get("audience") or {}), "description": args["audience_description"]
+        }
+        if args.get("age_range"):
+            audience["age_range"] = args["age_range"]
+        _update_campaign(state, update, args, audience=audience)
+    return f"Successfully defined target audience: {args['audience_description']}, {args.get('age_range', '')}"
+
+def _select_age_range(state: AgentState, update: Dict[str, Any], args: Dict[str, Any]) -> str:
+    campaign = target_campaign(
+        _campaigns(state, update),
+        args.get("campaign_id", ""),
+        _current(state, update, "current_campaign_id", "")
+    )
+    if campaign is not None:
+        _update_campaign(state, update, args, audience={
+            **(campaign.get("audience") or {}), "age_range": args["age_range"]
+        })
+    return f"Successfully selected target audience age range: {args['age_range']}"
+
+def _set_campaign_goals(state: AgentState, update: Dict[str, Any], args: Dict[str, Any]) -> str:
+    _update_campaign(state, update, args, goals=args["goals"])
+    return f"Successfully set campaign goals: {args['goals']}"
+
+def _select_marketing_channels(state: AgentState, update: Dict[str, Any], args: Dict[str, Any]) -> str:
+    _update_campaign(state, update, args, channels=parse_channels(args["channels"]))
+    return f"Successfully selected marketing channels: {args['channels']}"
+
+def _set_campaign_budget(state: AgentState, update: Dict[str, Any], args: Dict[str, Any]) -> str:
+    _update_campaign(state, update, args, budget=args["budget"])
+    return f"Successfully set campaign budget: {args['budget']}"
+
+TOOL_HANDLERS: Dict[str, Callable[[AgentState, Dict[str, Any], Dict[str, Any]], str]] = {
+    "WriteCampaign": _write_campaign,
+    "WriteCampaignBrief": _write_campaign_brief,
+    "CreateCampaign": _create_campaign,
+    "DeleteCampaign": _delete_campaign,
+    "CreateNewCampaign": _create_new_campaign,
+    "JustBrowsing": _just_browsing,
+    "DefineTargetAudience": _define_target_audience,
+    "SelectAgeRange": _select_age_range,
+    "SetCampaignGoals": _set_campaign_goals,
+    "SelectMarketingChannels": _select_marketing_channels,
+    "SetCampaignBudget": _set_campaign_budget,
+}
 
 
 async def chat_node(state: AgentState, config: RunnableConfig) -> \
@@ -85,6 +243,27 @@ async def chat_node(state: AgentState, config: RunnableConfig) -> \
         }],
     )
 
+    # Replies to the opening menu don't need the model
+    choice = menu_choice(state["messages"])
+    if choice is not None:
+        # Saves the call choosing the tool and the one replying after it
+        FAST_PATH_STATS.record(choice, 2)
+        tool_call_id = f"call_{uuid.uuid4().hex[:24]}"
+        tool_calls = [{"id": tool_call_id, "name": choice, "args": {}}]
+        return Command(
+            goto="__end__",
+            update={
+                "messages": [
+                    AIMessage(content="", tool_calls=tool_calls),
+                    ToolMessage(
+                        tool_call_id=tool_call_id,
+                        content=TOOL_HANDLERS[choice](state, {}, {})
+                    ),
+                    AIMessage(content=fast_path_reply(tool_calls)),
+                ]
+            }
+        )
+
     state["resources"] = state.get("resources", [])
     state["campaigns"] = state.get("campaigns", [])
     campaign_brief = state.get("campaign_brief", "")
@@ -93,318 +272,84 @@ async def chat_node(state: AgentState, config: RunnableConfig) -> \
     resources = []
 
     for resource in state["resources"]:
-        content = get_resource(resource["url"])
-        if content == "ERROR":
+        entry = await get_cached_resource(resource["url"])
+        if entry is not None and entry["error"]:
             continue
         resources.append({
             **resource,
-            "content": content
+            "content": entry["content"] if entry is not None else ""
         })
 
-    model = get_model(state)
-    # Prepare the kwargs for the ainvoke method
-    ainvoke_kwargs = {}
-    if model.__class__.__name__ in ["ChatOpenAI"]:
-        ainvoke_kwargs["parallel_tool_calls"] = False
-
-    response = await model.bind_tools(
-        [
-            Search,
-            WriteCampaign,
-            WriteCampaignBrief,
-            CreateCampaign,
-            DeleteCampaign,
-            DeleteResources,
-            CreateNewCampaign,
-            JustBrowsing,
-            DefineTargetAudience,
-            SelectAgeRange,
-            SetCampaignGoals,
-            SelectMarketingChannels,
-            SetCampaignBudget,
-        ],
-        **ainvoke_kwargs  # Pass the kwargs conditionally
-    ).ainvoke([
-        SystemMessage(
-            content=f"""
-            You are a marketing campaign assistant. You help the user create effective marketing campaigns.
-
-            Your primary job is to help users create and manage marketing campaigns. 
-            
-            When users start a conversation, ask them if they want to create a new marketing campaign to boost sales.
-            Offer two clear choices:
-            1. Yes, create a new campaign
-            2. No, just browsing
-            
-            If they choose "Yes, create a new campaign", use the CreateNewCampaign tool. Then use the CreateCampaign tool to add a new campaign to their workspace.
-            Ask them for a campaign title and use it to create the campaign.
-            
-            If they choose "No, just browsing", use the JustBrowsing tool, and tell them they can freely browse and ask for help anytime.
-            
-            # Special Message Handling
-            If the user sends a message containing "I need help customizing this campaign", DO NOT ask if they want to create a campaign again.
-            Instead, present them with options for customizing their campaign:
-            
-            1. Target Audience: Who are you trying to reach? Tell me about your ideal customer.
-            2. Campaign Goals: What do you want to achieve with this campaign? (e.g., increase website traffic, generate leads, boost sales)
-            3. Marketing Channels: Where will you reach your audience? (e.g., social media, email, search ads)
-            4. Campaign Budget: How much are you willing to spend?
-            
-            Then guide the user based on their selection:
-            
-            ## Target Audience
-            If they mention wanting to "define the target audience", use the DefineTargetAudience tool and help them identify their ideal customers.
-            First, offer them clickable options for age ranges:
-            - 18-24 years old
-            - 25-34 years old
-            - 35-44 years old
-            - 45-54 years old
-            - 55+ years old
-            
-            When they select an age range, use the SelectAgeRange tool. Then ask additional questions like:
-            - What gender demographic are you primarily targeting?
-            - What location or geographical area are you focusing on?
-            - What interests or behaviors do they have?
-            - What problems are they trying to solve?
-            
-            After collecting all this information, use the DefineTargetAudience tool with the complete description including the age range information.
-            
-            ## Campaign Goals
-            If they mention wanting to "set campaign goals", use the SetCampaignGoals tool and help them define specific, measurable goals.
-            Ask them questions like:
-            - Are you looking to increase brand awareness?
-            - Do you want to generate leads?
-            - Are you focused on direct sales?
-            - What metrics would indicate success?
-            
-            ## Marketing Channels
-            If they mention wanting to "choose marketing channels", use the SelectMarketingChannels tool and help them select the best platforms.
-            Ask them questions like:
-            - Where does your target audience spend time online?
-            - Which channels have worked well for you in the past?
-            - Do you prefer digital channels, traditional media, or a mix?
-            
-            ## Campaign Budget
-            If they mention wanting to "set a campaign budget", use the SetCampaignBudget tool and help them allocate resources effectively.
-            Ask them questions like:
-            - What's your total budget for this campaign?
-            - How do you want to distribute the budget across channels?
-            - Are there any cost constraints to be aware of?
-            
-            # Other Features
-            If a user asks to delete a campaign:
-            1. Ask them to confirm by typing the exact campaign title
-            2. Only proceed with deletion if they correctly type the campaign title
-            3. Use the DeleteCampaign tool with the campaign ID and confirmation title
-            
-            You can also help users create a campaign brief. After creating a campaign, guide them through key questions:
-            - What product or service is being marketed?
-            - Who is the target audience?
-            - What messaging style would work best?
-            
-            Do not recite the resources, instead use them as inspiration and reference for your campaign ideas.
-            
-            When asked about creating a campaign brief, use the WriteCampaignBrief tool.
-            When asked about creating a campaign draft, use the WriteCampaign tool.
-            Never EVER respond with the draft directly, only use the appropriate tool.
-
-            Current campaigns:
-            {state.get("campaigns", [])}
-            
-            This is the current campaign brief:
-            {campaign_brief}
-
-            This is the campaign draft:
-            {report}
-
-            Here are the references & inspiration that you have available:
-            {resources}
-            """
+    # Only the passages relevant to the latest user message go into the prompt
+    query = next(
+        (str(message.content) for message in reversed(state["messages"])
+         if isinstance(message, HumanMessage)),
+        ""
+    )
+
+    # Older turns are folded into a summary once the history gets long
+    messages, history_summary, history_update = await fit_history(state, config)
+
+    model = get_model(state, config)
+
+    # Parallel tool calls are allowed: all calls of a response are applied at once
+    response = await bind_tools_cached(model, CHAT_TOOLS).ainvoke([
+        build_system_message(
+            campaigns=campaign_index(state),
+            campaign_brief=campaign_brief,
+            report=report,
+            resources=resources,
+            query=query,
+            messages=messages,
+            history_summary=history_summary,
+            # Anthropic only caches prompt prefixes up to an explicit breakpoint
+            cache_control=model.__class__.__name__ == "ChatAnthropic",
         ),
-        *state["messages"],
+        *messages,
     ], config)
+    PROMPT_CACHE_STATS.record(response)
 
     ai_message = cast(AIMessage, response)
 
-    if ai_message.tool_calls:
-        if ai_message.tool_calls[0]["name"] == "WriteCampaign":
-            report = ai_message.tool_calls[0]["args"].get("report", "")
-            return Command(
-                goto="chat_node",
-                update={
-                    "report": report,
-                    "messages": [ai_message, ToolMessage(
-                    tool_call_id=ai_message.tool_calls[0]["id"],
-                    content="Campaign draft written."
-                    )]
-                }
-            )
-        if ai_message.tool_calls[0]["name"] == "WriteCampaignBrief":
-            campaign_brief = ai_message.tool_calls[0]["args"]["campaign_brief"]
-            return Command(
-                goto="chat_node",
-                update={
-                    "campaign_brief": campaign_brief,
-                    "messages": [ai_message, ToolMessage(
-                        tool_call_id=ai_message.tool_calls[0]["id"],
-                        content="Campaign brief written."
-                    )]
-                }
-            )
-        if ai_message.tool_calls[0]["name"] == "CreateCampaign":
-            title = ai_message.tool_calls[0]["args"]["title"]
-            status = ai_message.tool_calls[0]["args"].get("status", "draft")
-            
-            # Create a new campaign
-            new_campaign = {
-                "id": str(uuid.uuid4()),
-                "title": title,
-                "status": status,
-                "brief": campaign_brief,
-                "createdAt": datetime.datetime.now().isoformat()
+    if not ai_message.tool_calls:
+        return Command(
+            goto="__end__",
+            update={
+                **history_update,
+                "messages": response
             }
-            
-            # Add to campaigns list
-            campaigns = state.get("campaigns", [])
-            campaigns.append(new_campaign)
-            
-            return Command(
-                goto="chat_node",
-                update={
-                    "campaigns": campaigns,
-                    "messages": [ai_message, ToolMessage(
-                        tool_call_id=ai_message.tool_calls[0]["id"],
-                        content=f"New campaign '{title}' created successfully."
-                    )]
-                }
-            )
-        if ai_message.tool_calls[0]["name"] == "DeleteCampaign":
-            campaign_id = ai_message.tool_calls[0]["args"]["campaign_id"]
-            confirmation_title = ai_message.tool_calls[0]["args"]["confirmation_title"]
-            
-            # Get campaigns list
-            campaigns = state.get("campaigns", [])
-            
-            # Find campaign by ID
-            campaign_to_delete = next((c for c in campaigns if c["id"] == campaign_id), None)
-            
-            if campaign_to_delete and campaign_to_delete["title"] == confirmation_title:
-                # Remove campaign from list
-                campaigns = [c for c in campaigns if c["id"] != campaign_id]
-                
-                return Command(
-                    goto="chat_node",
-                    update={
-                        "campaigns": campaigns,
-                        "messages": [ai_message, ToolMessage(
-                            tool_call_id=ai_message.tool_calls[0]["id"],
-                            content=f"Campaign '{confirmation_title}' deleted successfully."
-                        )]
-                    }
-                )
-            else:
-                # Incorrect confirmation or campaign not found
-                return Command(
-                    goto="chat_node",
-                    update={
-                        "messages": [ai_message, ToolMessage(
-                            tool_call_id=ai_message.tool_calls[0]["id"],
-                            content=f"Cannot delete campaign. Either the campaign was not found or the confirmation title doesn't match."
-                        )]
-                    }
-                )
-        if ai_message.tool_calls[0]["name"] == "CreateNewCampaign":
-            return Command(
-                goto="chat_node",
-                update={
-                    "messages": [ai_message, ToolMessage(
-                        tool_call_id=ai_message.tool_calls[0]["id"],
-                        content="Let's create a new marketing campaign. What would you like to name it?"
-                    )]
-                }
-            )
-        if ai_message.tool_calls[0]["name"] == "JustBrowsing":
-            return Command(
-                goto="chat_node",
-                update={
-                    "messages": [ai_message, ToolMessage(
-                        tool_call_id=ai_message.tool_calls[0]["id"],
-                        content="No problem! Feel free to browse. Let me know if you need any help."
-                    )]
-                }
-            )
-        if ai_message.tool_calls[0]["name"] == "DefineTargetAudience":
-            audience_description = ai_message.tool_calls[0]["args"]["audience_description"]
-            age_range = ai_message.tool_calls[0]["args"]["age_range"]
-            # Update target audience information
-            return Command(
-                goto="chat_node",
-                update={
-                    "messages": [ai_message, ToolMessage(
-                        tool_call_id=ai_message.tool_calls[0]["id"],
-                        content=f"Successfully defined target audience: {audience_description}, {age_range}"
-                    )]
-                }
-            )
-        if ai_message.tool_calls[0]["name"] == "SelectAgeRange":
-            age_range = ai_message.tool_calls[0]["args"]["age_range"]
-            # Update target audience age range
-            return Command(
-                goto="chat_node",
-                update={
-                    "messages": [ai_message, ToolMessage(
-                        tool_call_id=ai_message.tool_calls[0]["id"],
-                        content=f"Successfully selected target audience age range: {age_range}"
-                    )]
-                }
-            )
-        if ai_message.tool_calls[0]["name"] == "SetCampaignGoals":
-            goals = ai_message.tool_calls[0]["args"]["goals"]
-            # Update campaign goals
-            return Command(
-                goto="chat_node",
-                update={
-                    "messages": [ai_message, ToolMessage(
-                        tool_call_id=ai_message.tool_calls[0]["id"],
-                        content=f"Successfully set campaign goals: {goals}"
-                    )]
-                }
-            )
-        if ai_message.tool_calls[0]["name"] == "SelectMarketingChannels":
-            channels = ai_message.tool_calls[0]["args"]["channels"]
-            # Update marketing channels
-            return Command(
-                goto="chat_node",
-                update={
-                    "messages": [ai_message, ToolMessage(
-                        tool_call_id=ai_message.tool_calls[0]["id"],
-                        content=f"Successfully selected marketing channels: {channels}"
-                    )]
-                }
-            )
-        if ai_message.tool_calls[0]["name"] == "SetCampaignBudget":
-            budget = ai_message.tool_calls[0]["args"]["budget"]
-            # Update campaign budget
-            return Command(
-                goto="chat_node",
-                update={
-                    "messages": [ai_message, ToolMessage(
-                        tool_call_id=ai_message.tool_calls[0]["id"],
-                        content=f"Successfully set campaign budget: {budget}"
-                    )]
-                }
-            )
-       
-    goto = "__end__"
-    if ai_message.tool_calls and ai_message.tool_calls[0]["name"] == "Search":
-        goto = "search_node"
-    elif ai_message.tool_calls and ai_message.tool_calls[0]["name"] == "DeleteResources":
-        goto = "delete_node"
-
-
-    return Command(
-        goto=goto,
-        update={
-            "messages": response
-        }
-    )
+        )
+
+    # Apply every tool call of the response in one state update
+    update: Dict[str, Any] = {**history_update}
+    tool_messages = []
+    goto = "chat_node"
+    for tool_call in ai_message.tool_calls:
+        name = tool_call["name"]
+        if name in ROUTED_TOOLS:
+            if goto == "chat_node":
+                goto = ROUTED_TOOLS[name]
+                continue
+            if ROUTED_TOOLS[name] == goto and name == "Search":
+                # search_node runs all Search calls of the message together
+                continue
+            content = f"{name} was not performed, only one of Search or DeleteResources " \
+                "can run at a time. Call it again on its own."
+        elif name in TOOL_HANDLERS:
+            content = TOOL_HANDLERS[name](state, update, tool_call["args"])
+        else:
+            content = f"Unknown tool: {name}"
+        tool_messages.append(ToolMessage(tool_call_id=tool_call["id"], content=content))
+
+    update["messages"] = [ai_message, *tool_messages]
+
+    # Confirmation-only tools are answered from templates instead of the
+    # model, unless the model already replied along with its tool calls
+    reply = fast_path_reply(ai_message.tool_calls) \
+        if goto == "chat_node" and not has_text(ai_message) else None
+    if reply is not None:
+        FAST_PATH_STATS.record(ai_message.tool_calls[-1]["name"])
+        update["messages"].append(AIMessage(content=reply))
+        goto = "__end__"
+
+    return Command(goto=goto, update=update)
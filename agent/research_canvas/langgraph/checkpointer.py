@@ -0,0 +1,138 @@
+"""
+Checkpointer selection for the graph.
+
+CHECKPOINTER=memory (the default) keeps threads in process memory, so they are
+lost on restart and cannot be shared between workers. CHECKPOINTER=sqlite
+stores them in a SQLite database (CHECKPOINT_DB_PATH) in WAL mode, which lets
+several worker processes on one host serve the same thread IDs and keeps
+threads across restarts.
+"""
+
+import os
+import itertools
+from typing import Any, AsyncIterator, Iterator, List, Optional
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from research_canvas.langgraph.serde import create_serde
+
+CHECKPOINTER = os.getenv("CHECKPOINTER", "memory")
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.sqlite")
+# Read connections per process; writes always go through a single connection
+CHECKPOINT_DB_READERS = int(os.getenv("CHECKPOINT_DB_READERS", "4"))
+# Seconds a connection waits for another process' write lock
+CHECKPOINT_DB_BUSY_TIMEOUT = float(os.getenv("CHECKPOINT_DB_BUSY_TIMEOUT", "30"))
+
+def _connect(path: str) -> aiosqlite.Connection:
+    # Not awaited here: AsyncSqliteSaver.setup() starts the connection lazily
+    # on the running loop and switches the database to WAL mode.
+    return aiosqlite.connect(path, timeout=CHECKPOINT_DB_BUSY_TIMEOUT)
+
+class PooledAsyncSqliteSaver(BaseCheckpointSaver):
+    """
+    An AsyncSqliteSaver with a pool of read connections.
+
+    SQLite allows one writer at a time, so all writes share one connection,
+    while reads are spread round-robin over CHECKPOINT_DB_READERS connections
+    that, thanks to WAL, never wait for the writer.
+    """
+
+    def __init__(self, path: str, readers: int = CHECKPOINT_DB_READERS, serde: Any = None):
+        super().__init__(serde=serde)
+        self.path = path
+        self.reader_count = max(readers, 1)
+        # AsyncSqliteSaver binds to the running event loop, which doesn't exist
+        # yet when the graph is compiled at import; the savers are created on
+        # first use from the loop instead.
+        self._writer: Optional[AsyncSqliteSaver] = None
+        self._readers: List[AsyncSqliteSaver] = []
+        self._next_reader: Optional[Iterator[AsyncSqliteSaver]] = None
+
+    @property
+    def writer(self) -> AsyncSqliteSaver:
+        """
+        The saver all writes go through.
+        """
+        if self._writer is None:
+            self._writer = AsyncSqliteSaver(_connect(self.path), serde=self.serde)
+        return self._writer
+
+    def _reader(self) -> AsyncSqliteSaver:
+        if self._next_reader is None:
+            self._readers = [
+                AsyncSqliteSaver(_connect(self.path), serde=self.serde)
+                for _ in range(self.reader_count)
+            ]
+            self._next_reader = itertools.cycle(self._readers)
+        return next(self._next_reader)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._reader().aget_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None, # pylint: disable=redefined-builtin
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        async for checkpoint_tuple in self._reader().alist(
+            config, filter=filter, before=before, limit=limit
+        ):
+            yield checkpoint_tuple
+
+    async def aput(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        return await self.writer.aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path: str = "") -> None:
+        return await self.writer.aput_writes(config, writes, task_id, task_path)
+
+    # Synchronous access (e.g. from other threads) goes through the writer,
+    # which must have been created on the event loop before
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.writer.get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None): # pylint: disable=redefined-builtin
+        return self.writer.list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        return self.writer.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path: str = "") -> None:
+        return self.writer.put_writes(config, writes, task_id, task_path)
+
+    def get_next_version(self, current, channel):
+        return AsyncSqliteSaver.get_next_version(self, current, channel)
+
+    async def aclose(self):
+        """
+        Close all connections.
+        """
+        savers = [self._writer, *self._readers] if self._writer else self._readers
+        for saver in savers:
+            if saver.conn.is_alive():
+                await saver.conn.close()
+
+def create_checkpointer(serde: Any = None) -> BaseCheckpointSaver:
+    """
+    Create the checkpointer selected by the CHECKPOINTER environment variable,
+    using the serializer selected by CHECKPOINT_SERDE unless one is given.
+    """
+    serde = serde or create_serde()
+    if CHECKPOINTER == "memory":
+        return MemorySaver(serde=serde)
+    if CHECKPOINTER == "sqlite":
+        print(f"Using SQLite checkpointer at {CHECKPOINT_DB_PATH}")
+        return PooledAsyncSqliteSaver(CHECKPOINT_DB_PATH, serde=serde)
+
+    raise ValueError(f"Invalid checkpointer specified: {CHECKPOINTER}")
+
+async def close_checkpointer(saver: BaseCheckpointSaver):
+    """
+    Close the database connections of a checkpointer, if it has any.
+    """
+    if isinstance(saver, PooledAsyncSqliteSaver):
+        await saver.aclose()
@@ -16,10 +16,20 @@ async def perform_delete_node(state: AgentState, config: RunnableConfig): # pyli
     """
     Perform Delete Node
     """
-    ai_message = cast(AIMessage, state["messages"][-2])
     tool_message = cast(ToolMessage, state["messages"][-1])
+    # Other tool calls of the same message may have been answered in between
+    ai_message, tool_call = next(
+        (
+            (message, tool_call)
+            for message in reversed(state["messages"]) if isinstance(message, AIMessage)
+            for tool_call in message.tool_calls if tool_call["id"] == tool_message.tool_call_id
+        ),
+        (cast(AIMessage, state["messages"][-2]), None)
+    )
     if tool_message.content == "YES":
-        if ai_message.tool_calls:
+        if tool_call is not None:
+            urls = tool_call["args"]["urls"]
+        elif ai_message.tool_calls:
             urls = ai_message.tool_calls[0]["args"]["urls"]
         else:
             parsed_tool_call = json.loads(ai_message.additional_kwargs["function_call"]["arguments"])
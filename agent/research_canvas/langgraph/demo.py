@@ -1,6 +1,7 @@
 """Demo"""
 
 import os
+import asyncio
 # from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 load_dotenv()
@@ -11,7 +12,11 @@ from fastapi import FastAPI
 import uvicorn
 from copilotkit.integrations.fastapi import add_fastapi_endpoint
 from copilotkit import CopilotKitRemoteEndpoint, LangGraphAgent
-from research_canvas.langgraph.agent import graph
+from research_canvas.langgraph.agent import graph, create_graph_with_model, checkpointer
+from research_canvas.langgraph.checkpointer import close_checkpointer
+from research_canvas.langgraph.retention import checkpoint_stats, run_compactor
+from research_canvas.http_session import close_session
+from research_canvas.convert import shutdown_pool
 
 
 # @asynccontextmanager
@@ -57,7 +62,7 @@ sdk = CopilotKitRemoteEndpoint(
         LangGraphAgent(
             name="research_agent_google_genai",
             description="Research agent.",
-            graph=graph
+            graph=create_graph_with_model("google_genai")
         ),
     ],
 )
@@ -72,6 +77,24 @@ def health():
     """Health check."""
     return {"status": "ok"}
 
+@app.get("/checkpoints")
+async def checkpoints():
+    """Checkpoint count and bytes per thread."""
+    return await checkpoint_stats(checkpointer)
+
+@app.on_event("startup")
+async def startup():
+    """Start the checkpoint compactor."""
+    app.state.compactor_task = asyncio.create_task(run_compactor(checkpointer))
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Close the shared download session, the conversion pool and the checkpointer."""
+    app.state.compactor_task.cancel()
+    await close_session()
+    shutdown_pool()
+    await close_checkpointer(checkpointer)
+
 def main():
     """Run the uvicorn server."""
     port = int(os.getenv("PORT", "8000"))
@@ -0,0 +1,164 @@
+"""
+Rule-based fast path for deterministic chat steps.
+
+Some tools only confirm what the user chose (CreateNewCampaign, JustBrowsing,
+SelectAgeRange). Going back to the model after them costs a full LLM
+round-trip just to phrase the next question. For the tools in
+FAST_PATH_TOOLS, chat_node answers from the templates below instead and ends
+the turn. Replies to the opening "create a campaign or just browse" menu
+("1", "2" or the button texts) skip the model entirely.
+
+The customization tools (SetCampaignGoals, DefineTargetAudience, ...) are
+also called when the user only starts that step, and the model then asks its
+follow-up questions. They have templates, but are not enabled by default, and
+even when enabled only take the fast path with their arguments filled in.
+
+FAST_PATH_TOOLS is a comma separated list of tool names; set it to an empty
+string to disable the fast path.
+"""
+
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+_CUSTOMIZE_NEXT = "What would you like to customize next: target audience, campaign goals, " \
+    "marketing channels or budget?"
+
+# Tool name -> (confirmation, follow-up question, arguments that must be
+# non-empty), the confirmation formatted with the tool arguments
+FAST_PATH_TEMPLATES: Dict[str, Tuple[Callable[[Dict[str, Any]], str], str, Tuple[str, ...]]] = {
+    "CreateNewCampaign": (
+        lambda args: "Great, let's create a new marketing campaign!",
+        "What would you like to name it?",
+        (),
+    ),
+    "JustBrowsing": (
+        lambda args: "No problem! Feel free to browse.",
+        "Let me know if you need any help.",
+        (),
+    ),
+    "SelectAgeRange": (
+        lambda args: f"Got it, we'll target people aged {args.get('age_range', '')}.",
+        "What gender demographic and location are you focusing on, what interests do they have "
+        "and what problems are they trying to solve?",
+        ("age_range",),
+    ),
+    "DefineTargetAudience": (
+        lambda args: f"Your target audience is set: {args.get('audience_description', '')}.",
+        _CUSTOMIZE_NEXT,
+        ("audience_description",),
+    ),
+    "SetCampaignGoals": (
+        lambda args: f"Your campaign goals are set: {args.get('goals', '')}.",
+        _CUSTOMIZE_NEXT,
+        ("goals",),
+    ),
+    "SelectMarketingChannels": (
+        lambda args: f"Your marketing channels are set: {args.get('channels', '')}.",
+        _CUSTOMIZE_NEXT,
+        ("channels",),
+    ),
+    "SetCampaignBudget": (
+        lambda args: f"Your campaign budget is set: {args.get('budget', '')}.",
+        _CUSTOMIZE_NEXT,
+        ("budget",),
+    ),
+}
+
+FAST_PATH_TOOLS = frozenset(
+    name.strip() for name in os.getenv(
+        "FAST_PATH_TOOLS", "CreateNewCampaign,JustBrowsing,SelectAgeRange"
+    ).split(",")
+    if name.strip() in FAST_PATH_TEMPLATES
+)
+
+# Replies to the opening menu and the tool that handles them; the digits
+# only count if the last assistant message offered that menu
+_MENU_REPLIES = {
+    "yes, create a new campaign": "CreateNewCampaign",
+    "no, just browsing": "JustBrowsing",
+}
+_MENU_DIGITS = {
+    "1": "CreateNewCampaign",
+    "2": "JustBrowsing",
+}
+
+class FastPathStats:
+    """
+    LLM calls avoided by the fast path, per tool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._avoided: Dict[str, int] = {}
+
+    def record(self, name: str, calls: int = 1):
+        """
+        Count `calls` avoided LLM calls for a tool.
+        """
+        with self._lock:
+            self._avoided[name] = self._avoided.get(name, 0) + calls
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Get the enabled tools and the avoided calls per tool and in total.
+        """
+        with self._lock:
+            avoided = dict(self._avoided)
+        return {
+            "tools": sorted(FAST_PATH_TOOLS),
+            "avoided_calls": avoided,
+            "total_avoided_calls": sum(avoided.values()),
+        }
+
+FAST_PATH_STATS = FastPathStats()
+
+def menu_choice(messages: Sequence[BaseMessage]) -> Optional[str]:
+    """
+    Get the tool for a reply to the opening menu, if the latest message is
+    one and the fast path is enabled for it.
+    """
+    if not messages or not isinstance(messages[-1], HumanMessage):
+        return None
+    reply = str(messages[-1].content).strip().rstrip(".").lower()
+    name = _MENU_REPLIES.get(reply)
+    if name is None and reply in _MENU_DIGITS:
+        offered = next(
+            (str(message.content).lower() for message in reversed(messages[:-1])
+             if isinstance(message, AIMessage) and message.content),
+            ""
+        )
+        if "campaign" in offered and "brows" in offered:
+            name = _MENU_DIGITS[reply]
+    return name if name in FAST_PATH_TOOLS else None
+
+def fast_path_reply(tool_calls: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Get the templated reply for the tool calls of a response, or None if any
+    of them needs the model.
+    """
+    if not tool_calls or any(
+        tool_call["name"] not in FAST_PATH_TOOLS
+        or any(not str(tool_call["args"].get(arg) or "").strip()
+               for arg in FAST_PATH_TEMPLATES[tool_call["name"]][2])
+        for tool_call in tool_calls
+    ):
+        return None
+    confirmations = [
+        FAST_PATH_TEMPLATES[tool_call["name"]][0](tool_call["args"]) for tool_call in tool_calls
+    ]
+    follow_up = FAST_PATH_TEMPLATES[tool_calls[-1]["name"]][1]
+    return " ".join([*confirmations, follow_up])
+
+def has_text(message: AIMessage) -> bool:
+    """
+    Whether a response says something besides its tool calls.
+    """
+    content = message.content
+    if isinstance(content, str):
+        return bool(content.strip())
+    return any(
+        (block.get("text", "") if isinstance(block, dict) else str(block)).strip()
+        for block in content
+    )
@@ -0,0 +1,136 @@
+"""
+Message history windowing.
+
+Long campaign sessions reach hundreds of messages. Once the history that is
+sent to the model grows beyond HISTORY_MAX_TOKENS, the oldest turns are
+folded into a running summary (state["history_summary"]) until the recent
+turns kept verbatim fit into HISTORY_KEEP_TOKENS. The summary is updated
+incrementally: only the newly folded turns are summarized, together with the
+previous summary. The messages themselves stay in state for the UI;
+state["history_summary_until"] is the id of the last folded message.
+
+The window always starts at a user message, so tool calls and their tool
+messages are never separated.
+"""
+
+import os
+import json
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from copilotkit.langgraph import copilotkit_customize_config
+from research_canvas.langgraph.state import AgentState
+from research_canvas.langgraph.model import get_model
+from research_canvas.langgraph.prompt import count_message_tokens
+from research_canvas.tokens import truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# History tokens at which older turns are folded into the summary
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "8000"))
+# History tokens kept verbatim after folding
+HISTORY_KEEP_TOKENS = int(os.getenv("HISTORY_KEEP_TOKENS", "4000"))
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "800"))
+
+SUMMARY_INSTRUCTIONS = f"""
+You maintain the running summary of a conversation between a user and a marketing campaign assistant.
+Update the previous summary with the new messages. Keep every fact that later turns may rely on:
+campaign titles and IDs, target audience, goals, channels, budget, decisions, open questions and
+the user's preferences. Leave out greetings and anything already superseded.
+Keep it under {HISTORY_SUMMARY_MAX_TOKENS} tokens.
+Respond with a JSON object of the form {{"summary": "..."}}.
+"""
+
+def history_window(state: AgentState) -> List[BaseMessage]:
+    """
+    Get the messages that have not been folded into the summary yet.
+    """
+    messages = state["messages"]
+    until = state.get("history_summary_until")
+    if until:
+        for i in range(len(messages) - 1, -1, -1):
+            if messages[i].id == until:
+                return messages[i + 1:]
+    return messages
+
+def _window_start(messages: Sequence[BaseMessage], keep_tokens: int) -> int:
+    """
+    Get the index of the earliest turn boundary after which at most
+    `keep_tokens` remain, or the latest boundary if none qualifies.
+    """
+    boundaries = [
+        i for i, message in enumerate(messages)
+        if i > 0 and isinstance(message, HumanMessage)
+    ]
+    for boundary in boundaries:
+        if count_message_tokens(messages[boundary:]) <= keep_tokens:
+            return boundary
+    return boundaries[-1] if boundaries else 0
+
+def _transcript(messages: Sequence[BaseMessage]) -> str:
+    lines = []
+    for message in messages:
+        text = str(message.content)
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            text += " " + json.dumps(
+                [{"name": call["name"], "args": call["args"]} for call in tool_calls],
+                default=str
+            )
+        if isinstance(message, ToolMessage):
+            lines.append(f"tool result: {text}")
+        else:
+            lines.append(f"{message.type}: {text}")
+    return "\n".join(lines)
+
+async def _summarize(
+    state: AgentState,
+    config: RunnableConfig,
+    summary: str,
+    messages: Sequence[BaseMessage]
+) -> str:
+    # The summary is internal; don't stream it to the frontend
+    config = copilotkit_customize_config(config, emit_messages=False, emit_tool_calls=False)
+    response = await get_model(state, config).ainvoke([
+        SystemMessage(content=SUMMARY_INSTRUCTIONS),
+        HumanMessage(
+            content=f"Previous summary:\n{summary or '(none)'}\n\nNew messages:\n{_transcript(messages)}"
+        ),
+    ], config)
+    text = str(response.content)
+    try:
+        text = json.loads(text)["summary"]
+    except (ValueError, KeyError, TypeError):
+        pass
+    return truncate_to_tokens(str(text), HISTORY_SUMMARY_MAX_TOKENS)
+
+async def fit_history(
+    state: AgentState,
+    config: RunnableConfig
+) -> Tuple[List[BaseMessage], str, Dict[str, Any]]:
+    """
+    Get the messages to send, the summary of the earlier ones and the state
+    update recording a new summary (empty if nothing was folded).
+    """
+    summary: Optional[str] = state.get("history_summary", "")
+    window = history_window(state)
+    if count_message_tokens(window) <= HISTORY_MAX_TOKENS:
+        return window, summary or "", {}
+
+    start = _window_start(window, HISTORY_KEEP_TOKENS)
+    if start == 0:
+        return window, summary or "", {}
+
+    folded = window[:start]
+    try:
+        summary = await _summarize(state, config, summary or "", folded)
+    except Exception as e: # pylint: disable=broad-except
+        print(f"History summarization failed, sending the full history: {e}")
+        return window, summary or "", {}
+
+    logger.debug("History: folded %d messages into the summary, %d kept", len(folded), len(window) - start)
+    return window[start:], summary, {
+        "history_summary": summary,
+        "history_summary_until": folded[-1].id,
+    }
@@ -1,53 +1,152 @@
 """
 This module provides a function to get a model based on the configuration.
+
+Chat model clients are created once per (provider, model, params) and reused,
+so their HTTP connection pools to the provider stay warm across turns and
+sessions. Models with tools bound to them are cached as well, so the tool
+schemas are only generated once per model.
 """
 import os
-from typing import cast, Any
+import asyncio
+import threading
+from typing import cast, Any, Dict, Optional, Sequence, Tuple
+import httpx
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import Runnable, RunnableConfig
 from research_canvas.langgraph.state import AgentState
 from research_canvas.langgraph.model_config import get_current_model
 
-def get_model(state: AgentState) -> BaseChatModel:
+# Model name and constructor parameters per provider
+_MODEL_SPECS: Dict[str, Tuple[str, Dict[str, Any]]] = {
+    "openai": ("gpt-4o-mini", {
+        "temperature": 0,
+        "model_kwargs": {"response_format": {"type": "json_object"}},
+        # Report usage (including cached prompt tokens) when streamed as well
+        "stream_usage": True,
+    }),
+    "anthropic": ("claude-3-5-sonnet-20240620", {
+        "temperature": 0,
+        "timeout": None,
+        "stop": None,
+    }),
+    "google_genai": ("gemini-1.5-pro", {
+        "temperature": 0,
+        "convert_system_message_to_human": True,
+    }),
+}
+
+_MODELS: Dict[Tuple[str, str, str], BaseChatModel] = {}
+_MODELS_LOCK = threading.Lock()
+_BOUND_MODELS: Dict[Tuple[int, Tuple[int, ...], str], Runnable] = {}
+
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+_HTTP_CLIENT: Optional[httpx.Client] = None
+# An httpx.AsyncClient's pooled connections are bound to the loop they were
+# opened on, so keep one per loop.
+_ASYNC_HTTP_CLIENTS: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+
+def _loop_http_client() -> httpx.AsyncClient:
     """
-    Get a model based on the environment variable.
+    Get the async client for the running event loop, creating it on first use.
     """
+    loop = asyncio.get_running_loop()
+    client = _ASYNC_HTTP_CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        # Forget clients whose loop is gone (e.g. short-lived asyncio.run loops)
+        for stale_loop in [l for l in _ASYNC_HTTP_CLIENTS if l.is_closed()]:
+            del _ASYNC_HTTP_CLIENTS[stale_loop]
+        client = httpx.AsyncClient(limits=_HTTP_LIMITS)
+        _ASYNC_HTTP_CLIENTS[loop] = client
+    return client
 
-    # First try to get from state
-    state_model = state.get("model")
-    
-    # Then try to get from agent module
-    agent_model = get_current_model()
-    
-    # Then try to get from environment variable
-    env_model = os.getenv("MODEL")
-    
-    # Choose model based on priority
-    model = state_model or agent_model or env_model or "openai"
+class _LoopHttpClient(httpx.AsyncClient):
+    """
+    The async client handed to the memoized models: requests are sent
+    through the pooled client of the running loop.
+    """
 
-    print(f"Using model: {model} (from {'state' if state_model else 'agent' if agent_model else 'env' if env_model else 'default'})")
+    async def send(self, request: httpx.Request, **kwargs) -> httpx.Response: # pylint: disable=arguments-differ
+        return await _loop_http_client().send(request, **kwargs)
+
+def _shared_http_clients():
+    """
+    Get the httpx clients shared by all OpenAI models of this process.
+    """
+    global _HTTP_CLIENT # pylint: disable=global-statement
+    if _HTTP_CLIENT is None:
+        _HTTP_CLIENT = httpx.Client(limits=_HTTP_LIMITS)
+    return _HTTP_CLIENT, _LoopHttpClient()
 
-    if model == "openai":
+def _create_model(provider: str, model_name: str, params: Dict[str, Any]) -> BaseChatModel:
+    if provider == "openai":
         from langchain_openai import ChatOpenAI
+        http_client, http_async_client = _shared_http_clients()
         return ChatOpenAI(
-            temperature=0, 
-            model="gpt-4o-mini", 
-            model_kwargs={"response_format": {"type": "json_object"}}
+            model=model_name,
+            http_client=http_client,
+            http_async_client=http_async_client,
+            **params
         )
-    if model == "anthropic":
+    if provider == "anthropic":
         from langchain_anthropic import ChatAnthropic
-        return ChatAnthropic(
-            temperature=0,
-            model_name="claude-3-5-sonnet-20240620",
-            timeout=None,
-            stop=None
-        )
-    if model == "google_genai":
+        return ChatAnthropic(model_name=model_name, **params)
+    if provider == "google_genai":
         from langchain_google_genai import ChatGoogleGenerativeAI
         return ChatGoogleGenerativeAI(
-            temperature=0,
-            model="gemini-1.5-pro",
+            model=model_name,
             api_key=cast(Any, os.getenv("GOOGLE_API_KEY")) or None,
-            convert_system_message_to_human=True
+            **params
         )
 
     raise ValueError("Invalid model specified")
+
+def get_model(state: AgentState, config: Optional[RunnableConfig] = None) -> BaseChatModel:
+    """
+    Get a model based on the state, the run config or the environment variable.
+    """
+
+    # First try to get from state
+    state_model = state.get("model")
+
+    # Then try to get from the run config of this graph
+    config_model = ((config or {}).get("configurable") or {}).get("model")
+
+    # Then try to get from the current request context
+    context_model = get_current_model()
+
+    # Then try to get from environment variable
+    env_model = os.getenv("MODEL")
+
+    # Choose model based on priority
+    provider = state_model or config_model or context_model or env_model or "openai"
+
+    if provider not in _MODEL_SPECS:
+        raise ValueError("Invalid model specified")
+    model_name, params = _MODEL_SPECS[provider]
+    key = (provider, model_name, repr(sorted(params.items())))
+
+    model = _MODELS.get(key)
+    if model is None:
+        with _MODELS_LOCK:
+            model = _MODELS.get(key)
+            if model is None:
+                print(f"Creating model client: {provider} ({model_name})")
+                model = _create_model(provider, model_name, params)
+                _MODELS[key] = model
+    return model
+
+def bind_tools_cached(model: BaseChatModel, tools: Sequence[Any], **kwargs) -> Runnable:
+    """
+    Get `model.bind_tools(tools, **kwargs)`, reusing the runnable bound earlier
+    for the same model, tools and arguments.
+    """
+    # Models are memoized and tools are module level, so their ids are stable
+    key = (id(model), tuple(id(tool) for tool in tools), repr(sorted(kwargs.items())))
+    bound = _BOUND_MODELS.get(key)
+    if bound is None:
+        with _MODELS_LOCK:
+            bound = _BOUND_MODELS.get(key)
+            if bound is None:
+                bound = model.bind_tools(list(tools), **kwargs)
+                _BOUND_MODELS[key] = bound
+    return bound
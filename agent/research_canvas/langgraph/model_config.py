@@ -1,18 +1,35 @@
 """
 This module provides shared configuration and state for model selection.
+
+The model is selected per request, never per process: a run can set it in its
+config (`configurable.model`), graphs created with create_graph_with_model run
+their nodes inside `use_model`, and ad-hoc callers can scope it the same way.
+All of these are safe when one process serves several agents with different
+models concurrently.
 """
 
-# 在模块级别定义一个变量，用于存储当前使用的模型名称
-current_model = None
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# 当前请求（上下文）使用的模型名称，不会影响其他并发请求
+_current_model: ContextVar[Optional[str]] = ContextVar("current_model", default=None)
 
 # 更新模型使用的函数
 def set_current_model(model_name):
-    """设置当前使用的模型名称"""
-    global current_model
-    current_model = model_name
-    print(f"Set current model to: {current_model}")
+    """设置当前上下文使用的模型名称"""
+    _current_model.set(model_name)
 
 # 获取当前模型的函数
 def get_current_model():
-    """获取当前使用的模型名称"""
-    return current_model 
\ No newline at end of file
+    """获取当前上下文使用的模型名称"""
+    return _current_model.get()
+
+@contextmanager
+def use_model(model_name):
+    """在with代码块内使用指定的模型名称"""
+    token = _current_model.set(model_name)
+    try:
+        yield
+    finally:
+        _current_model.reset(token)
@@ -0,0 +1,276 @@
+"""
+System prompt assembly for the chat node, within a token budget.
+
+The instructions are always sent in full. The remaining budget, after
+reserving room for the message history and the model output, is handed out
+in priority order: campaign draft, campaign brief, campaigns, and finally
+the resource passages. Sections that do not fit are truncated.
+
+The instructions never change, so they form a static prefix that provider
+prompt caches can reuse across turns and sessions. All per-turn sections
+follow them, ordered from least to most volatile. For Anthropic the prefix
+is a separate content block with a cache breakpoint. OpenAI caches matching
+prefixes automatically, so it gets a plain string that starts with the same
+instructions every time.
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Sequence
+from langchain_core.messages import BaseMessage, SystemMessage
+from research_canvas.cache import LRUCache
+from research_canvas.retrieval import select_passages
+from research_canvas.langgraph.campaigns import summarize_campaigns
+from research_canvas.tokens import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Total tokens we allow for one chat_node call (system prompt, history, output)
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "32000"))
+# Tokens kept free for the model's answer
+PROMPT_OUTPUT_RESERVE = int(os.getenv("PROMPT_OUTPUT_RESERVE", "4000"))
+
+INSTRUCTIONS = """
+You are a marketing campaign assistant. You help the user create effective marketing campaigns.
+
+Your primary job is to help users create and manage marketing campaigns.
+
+When users start a conversation, ask them if they want to create a new marketing campaign to boost sales.
+Offer two clear choices:
+1. Yes, create a new campaign
+2. No, just browsing
+
+If they choose "Yes, create a new campaign", use the CreateNewCampaign tool. Then use the CreateCampaign tool to add a new campaign to their workspace.
+Ask them for a campaign title and use it to create the campaign.
+
+If they choose "No, just browsing", use the JustBrowsing tool, and tell them they can freely browse and ask for help anytime.
+
+# Special Message Handling
+If the user sends a message containing "I need help customizing this campaign", DO NOT ask if they want to create a campaign again.
+Instead, present them with options for customizing their campaign:
+
+1. Target Audience: Who are you trying to reach? Tell me about your ideal customer.
+2. Campaign Goals: What do you want to achieve with this campaign? (e.g., increase website traffic, generate leads, boost sales)
+3. Marketing Channels: Where will you reach your audience? (e.g., social media, email, search ads)
+4. Campaign Budget: How much are you willing to spend?
+
+Then guide the user based on their selection:
+
+## Target Audience
+If they mention wanting to "define the target audience", use the DefineTargetAudience tool and help them identify their ideal customers.
+First, offer them clickable options for age ranges:
+- 18-24 years old
+- 25-34 years old
+- 35-44 years old
+- 45-54 years old
+- 55+ years old
+
+When they select an age range, use the SelectAgeRange tool. Then ask additional questions like:
+- What gender demographic are you primarily targeting?
+- What location or geographical area are you focusing on?
+- What interests or behaviors do they have?
+- What problems are they trying to solve?
+
+After collecting all this information, use the DefineTargetAudience tool with the complete description including the age range information.
+
+## Campaign Goals
+If they mention wanting to "set campaign goals", use the SetCampaignGoals tool and help them define specific, measurable goals.
+Ask them questions like:
+- Are you looking to increase brand awareness?
+- Do you want to generate leads?
+- Are you focused on direct sales?
+- What metrics would indicate success?
+
+## Marketing Channels
+If they mention wanting to "choose marketing channels", use the SelectMarketingChannels tool and help them select the best platforms.
+Ask them questions like:
+- Where does your target audience spend time online?
+- Which channels have worked well for you in the past?
+- Do you prefer digital channels, traditional media, or a mix?
+
+## Campaign Budget
+If they mention wanting to "set a campaign budget", use the SetCampaignBudget tool and help them allocate resources effectively.
+Ask them questions like:
+- What's your total budget for this campaign?
+- How do you want to distribute the budget across channels?
+- Are there any cost constraints to be aware of?
+
+# Other Features
+If a user asks to delete a campaign:
+1. Ask them to confirm by typing the exact campaign title
+2. Only proceed with deletion if they correctly type the campaign title
+3. Use the DeleteCampaign tool with the campaign ID and confirmation title
+
+You can also help users create a campaign brief. After creating a campaign, guide them through key questions:
+- What product or service is being marketed?
+- Who is the target audience?
+- What messaging style would work best?
+
+Do not recite the resources, instead use them as inspiration and reference for your campaign ideas.
+
+When asked about creating a campaign brief, use the WriteCampaignBrief tool.
+When asked about creating a campaign draft, use the WriteCampaign tool.
+Never EVER respond with the draft directly, only use the appropriate tool.
+"""
+
+_INSTRUCTIONS_TOKENS = count_tokens(INSTRUCTIONS)
+_TRUNCATED = "\n[... truncated to fit the prompt budget]"
+
+# Token counts of messages by message id; the size of every entry is 1,
+# so max_bytes is the number of messages remembered.
+_MESSAGE_TOKENS = LRUCache(max_bytes=50_000)
+
+def count_message_tokens(messages: Sequence[BaseMessage]) -> int:
+    """
+    Count the tokens of the message history, caching counts by message id.
+    """
+    total = 0
+    for message in messages:
+        tokens = _MESSAGE_TOKENS.get(message.id) if message.id else None
+        if tokens is None:
+            text = str(message.content)
+            tool_calls = getattr(message, "tool_calls", None)
+            if tool_calls:
+                text += str(tool_calls)
+            tokens = count_tokens(text) + 4
+            if message.id:
+                _MESSAGE_TOKENS.set(message.id, tokens, size=1)
+        total += tokens
+    return total
+
+def _fit(text: str, budget: int) -> str:
+    """
+    Truncate a section to its share of the budget.
+    """
+    if count_tokens(text) <= budget:
+        return text
+    # Not even the truncation marker fits
+    if budget <= count_tokens(_TRUNCATED):
+        return ""
+    return truncate_to_tokens(text, max(budget - count_tokens(_TRUNCATED), 0)) + _TRUNCATED
+
+def build_system_message(
+    campaigns: Dict[str, Dict[str, Any]],
+    campaign_brief: str,
+    report: str,
+    resources: List[Dict[str, Any]],
+    query: str,
+    messages: Sequence[BaseMessage],
+    history_summary: str = "",
+    cache_control: bool = False,
+) -> SystemMessage:
+    """
+    Build the chat node system message so that it fits PROMPT_MAX_TOKENS
+    together with the message history and the output reserve. Campaigns
+    (by id) are rendered as a compact summary. With
+    `cache_control`, the instructions are marked as an (Anthropic) prompt
+    cache breakpoint.
+    `resources` carry their full "content"; only the passages most relevant
+    to `query` that fit the remaining budget are included. `messages` are
+    the ones sent along, `history_summary` summarizes the earlier ones.
+    """
+    history_tokens = count_message_tokens(messages) + count_tokens(history_summary)
+    available = PROMPT_MAX_TOKENS - PROMPT_OUTPUT_RESERVE - history_tokens - _INSTRUCTIONS_TOKENS
+    remaining = max(available, 0)
+
+    sections = {}
+    for name, text in (
+        ("report", report),
+        ("campaign_brief", campaign_brief),
+        ("campaigns", summarize_campaigns(campaigns)),
+    ):
+        sections[name] = _fit(text, remaining)
+        remaining -= count_tokens(sections[name])
+
+    # Titles and descriptions are cheap, passages get whatever is left
+    remaining -= count_tokens(str([
+        {key: value for key, value in resource.items() if key != "content"}
+        for resource in resources
+    ]))
+    selected = select_passages(resources, query, max_tokens=max(remaining, 0))
+
+    passage_count = sum(len(resource["passages"]) for resource in selected)
+    logger.debug(
+        "Prompt budget: %d tokens for context after %d history, %d instructions; "
+        "%d passages included",
+        available, history_tokens, _INSTRUCTIONS_TOKENS, passage_count
+    )
+
+    summary_section = f"""
+Summary of the earlier conversation:
+{history_summary}
+""" if history_summary else ""
+
+    context = f"""
+Current campaigns:
+{sections["campaigns"]}
+
+This is the current campaign brief:
+{sections["campaign_brief"]}
+
+This is the campaign draft:
+{sections["report"]}
+{summary_section}
+Here are the references & inspiration that you have available,
+with the passages most relevant to the conversation:
+{selected}
+"""
+
+    if cache_control:
+        return SystemMessage(content=[
+            {"type": "text", "text": INSTRUCTIONS, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": context},
+        ])
+    return SystemMessage(content=INSTRUCTIONS + context)
+
+class PromptCacheStats:
+    """
+    Input tokens served from the provider prompt cache, over all calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+
+    def record(self, response: Any):
+        """
+        Record the usage of a model response and log its cached-token ratio.
+        """
+        usage = getattr(response, "usage_metadata", None)
+        if not usage:
+            return
+        details = usage.get("input_token_details") or {}
+        input_tokens = usage.get("input_tokens", 0)
+        cache_read = details.get("cache_read") or 0
+        cache_creation = details.get("cache_creation") or 0
+        with self._lock:
+            self.calls += 1
+            self.input_tokens += input_tokens
+            self.cache_read_tokens += cache_read
+            self.cache_creation_tokens += cache_creation
+        logger.debug(
+            "Prompt cache: %d/%d input tokens cached (%.0f%%), %d written",
+            cache_read, input_tokens,
+            100 * cache_read / input_tokens if input_tokens else 0.0, cache_creation
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Get the counters and the overall cached-token ratio.
+        """
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "input_tokens": self.input_tokens,
+                "cache_read_tokens": self.cache_read_tokens,
+                "cache_creation_tokens": self.cache_creation_tokens,
+                "cache_read_ratio": (
+                    self.cache_read_tokens / self.input_tokens if self.input_tokens else 0.0
+                ),
+            }
+
+PROMPT_CACHE_STATS = PromptCacheStats()
@@ -0,0 +1,242 @@
+"""
+Checkpoint retention.
+
+Every super-step of every thread stores a checkpoint, so without retention
+the checkpointer grows with traffic rather than with active users. The
+compactor keeps the last CHECKPOINT_KEEP_LAST checkpoints of each thread
+(enough for the delete confirmation interrupt and a few steps of history)
+and evicts threads that have been idle for longer than CHECKPOINT_THREAD_TTL.
+"""
+
+import os
+import time
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+from research_canvas.langgraph.checkpointer import PooledAsyncSqliteSaver
+
+# Checkpoints kept per thread (and checkpoint namespace); 0 keeps all
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+# Threads without a new checkpoint for this many seconds are evicted; 0 keeps them
+CHECKPOINT_THREAD_TTL = float(os.getenv("CHECKPOINT_THREAD_TTL", str(24 * 3600)))
+# Seconds between two compactor runs
+CHECKPOINT_COMPACT_INTERVAL = float(os.getenv("CHECKPOINT_COMPACT_INTERVAL", "300"))
+
+# 100ns intervals between the Gregorian epoch of UUID timestamps and the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+def checkpoint_time(checkpoint_id: str) -> float:
+    """
+    Get the Unix time a checkpoint was created at from its (UUIDv6) ID.
+    """
+    value = int(checkpoint_id.replace("-", ""), 16)
+    time_high = value >> 96
+    time_mid = (value >> 80) & 0xFFFF
+    time_low = (value >> 64) & 0x0FFF
+    timestamp = (time_high << 28) | (time_mid << 12) | time_low
+    return (timestamp - _UUID_EPOCH_OFFSET) / 1e7
+
+def _nbytes(value: Any) -> int:
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(item) for item in value)
+    return 0
+
+def _blobs(saver: MemorySaver) -> Dict[Tuple[str, str, str, Any], Any]:
+    # Newer MemorySaver versions store channel values apart from the
+    # checkpoints; up to langgraph-checkpoint 2.0.21 they are stored inline.
+    return getattr(saver, "blobs", {})
+
+def _memory_stats(saver: MemorySaver) -> Dict[str, Dict[str, int]]:
+    stats: Dict[str, Dict[str, int]] = {}
+    for thread_id, namespaces in list(saver.storage.items()):
+        entry = stats.setdefault(thread_id, {"checkpoints": 0, "bytes": 0})
+        for checkpoints in list(namespaces.values()):
+            entry["checkpoints"] += len(checkpoints)
+            entry["bytes"] += sum(_nbytes(saved) for saved in list(checkpoints.values()))
+    for (thread_id, _, _), writes in list(saver.writes.items()):
+        if thread_id in stats:
+            stats[thread_id]["bytes"] += sum(_nbytes(write) for write in list(writes.values()))
+    for (thread_id, _, _, _), blob in list(_blobs(saver).items()):
+        if thread_id in stats:
+            stats[thread_id]["bytes"] += _nbytes(blob)
+    return stats
+
+def _memory_drop(
+    saver: MemorySaver,
+    thread_id: str,
+    checkpoint_ns: str,
+    checkpoint_ids: Iterable[str],
+    blob_keys: List[Tuple[str, str, str, Any]]
+):
+    checkpoints = saver.storage[thread_id][checkpoint_ns]
+    for checkpoint_id in checkpoint_ids:
+        checkpoints.pop(checkpoint_id, None)
+        saver.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+
+    # Channel values are stored once per version and shared between
+    # checkpoints; only drop the versions no remaining checkpoint refers to.
+    if blob_keys:
+        referenced = set()
+        for saved_checkpoint, _, _ in checkpoints.values():
+            checkpoint = saver.serde.loads_typed(saved_checkpoint)
+            referenced.update(checkpoint["channel_versions"].items())
+        blobs = _blobs(saver)
+        for key in blob_keys:
+            if (key[2], key[3]) not in referenced:
+                blobs.pop(key, None)
+
+    if not checkpoints:
+        del saver.storage[thread_id][checkpoint_ns]
+    if not saver.storage[thread_id]:
+        del saver.storage[thread_id]
+
+def _memory_compact(saver: MemorySaver, keep_last: int, cutoff: Optional[float]) -> Dict[str, int]:
+    result = {"checkpoints": 0, "threads": 0}
+    blob_keys: Dict[Tuple[str, str], List[Tuple[str, str, str, Any]]] = {}
+    for key in list(_blobs(saver)):
+        blob_keys.setdefault((key[0], key[1]), []).append(key)
+
+    for thread_id, namespaces in list(saver.storage.items()):
+        latest = max(
+            (max(checkpoints) for checkpoints in namespaces.values() if checkpoints),
+            default=None
+        )
+        if latest is None or (cutoff is not None and checkpoint_time(latest) < cutoff):
+            for checkpoint_ns, checkpoints in list(namespaces.items()):
+                result["checkpoints"] += len(checkpoints)
+                _memory_drop(
+                    saver, thread_id, checkpoint_ns, list(checkpoints),
+                    blob_keys.get((thread_id, checkpoint_ns), [])
+                )
+            result["threads"] += 1
+            continue
+        if not keep_last:
+            continue
+        for checkpoint_ns, checkpoints in list(namespaces.items()):
+            # Checkpoint IDs are time ordered
+            expired = sorted(checkpoints, reverse=True)[keep_last:]
+            if expired:
+                result["checkpoints"] += len(expired)
+                _memory_drop(
+                    saver, thread_id, checkpoint_ns, expired,
+                    blob_keys.get((thread_id, checkpoint_ns), [])
+                )
+    return result
+
+async def _sqlite_stats(saver: PooledAsyncSqliteSaver) -> Dict[str, Dict[str, int]]:
+    writer = saver.writer
+    await writer.setup()
+    stats: Dict[str, Dict[str, int]] = {}
+    async with writer.lock:
+        async with writer.conn.execute(
+            "SELECT thread_id, COUNT(*), SUM(LENGTH(checkpoint) + LENGTH(metadata)) "
+            "FROM checkpoints GROUP BY thread_id"
+        ) as cursor:
+            async for thread_id, count, size in cursor:
+                stats[thread_id] = {"checkpoints": count, "bytes": size or 0}
+        async with writer.conn.execute(
+            "SELECT thread_id, SUM(LENGTH(value)) FROM writes GROUP BY thread_id"
+        ) as cursor:
+            async for thread_id, size in cursor:
+                if thread_id in stats:
+                    stats[thread_id]["bytes"] += size or 0
+    return stats
+
+async def _sqlite_compact(saver: PooledAsyncSqliteSaver, keep_last: int, cutoff: Optional[float]) -> Dict[str, int]:
+    writer = saver.writer
+    await writer.setup()
+    result = {"checkpoints": 0, "threads": 0}
+    async with writer.lock:
+        conn = writer.conn
+        if cutoff is not None:
+            async with conn.execute(
+                "SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id"
+            ) as cursor:
+                idle = [
+                    (thread_id,) async for thread_id, latest in cursor
+                    if checkpoint_time(latest) < cutoff
+                ]
+            if idle:
+                before = conn.total_changes
+                await conn.executemany("DELETE FROM checkpoints WHERE thread_id = ?", idle)
+                result["checkpoints"] += conn.total_changes - before
+                await conn.executemany("DELETE FROM writes WHERE thread_id = ?", idle)
+                result["threads"] = len(idle)
+        if keep_last:
+            cursor = await conn.execute(
+                """
+                DELETE FROM checkpoints WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (
+                            PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                        ) AS position FROM checkpoints
+                    ) WHERE position > ?
+                )
+                """,
+                (keep_last,)
+            )
+            result["checkpoints"] += cursor.rowcount
+            await cursor.close()
+            await conn.execute(
+                """
+                DELETE FROM writes WHERE NOT EXISTS (
+                    SELECT 1 FROM checkpoints
+                    WHERE checkpoints.thread_id = writes.thread_id
+                    AND checkpoints.checkpoint_ns = writes.checkpoint_ns
+                    AND checkpoints.checkpoint_id = writes.checkpoint_id
+                )
+                """
+            )
+        await conn.commit()
+    return result
+
+async def checkpoint_stats(saver: BaseCheckpointSaver) -> Dict[str, Any]:
+    """
+    Get the number of checkpoints and their size in bytes, per thread and in total.
+    """
+    threads: Dict[str, Dict[str, int]] = {}
+    if isinstance(saver, MemorySaver):
+        threads = _memory_stats(saver)
+    elif isinstance(saver, PooledAsyncSqliteSaver):
+        threads = await _sqlite_stats(saver)
+    return {
+        "threads": threads,
+        "checkpoints": sum(thread["checkpoints"] for thread in threads.values()),
+        "bytes": sum(thread["bytes"] for thread in threads.values()),
+    }
+
+async def compact(
+    saver: BaseCheckpointSaver,
+    keep_last: int = CHECKPOINT_KEEP_LAST,
+    thread_ttl: float = CHECKPOINT_THREAD_TTL
+) -> Dict[str, int]:
+    """
+    Drop all but the last `keep_last` checkpoints of each thread and every
+    thread idle for more than `thread_ttl` seconds. Returns how many
+    checkpoints and threads were removed.
+    """
+    cutoff = time.time() - thread_ttl if thread_ttl else None
+    if isinstance(saver, MemorySaver):
+        return _memory_compact(saver, keep_last, cutoff)
+    if isinstance(saver, PooledAsyncSqliteSaver):
+        return await _sqlite_compact(saver, keep_last, cutoff)
+    return {"checkpoints": 0, "threads": 0}
+
+async def run_compactor(saver: BaseCheckpointSaver, interval: float = CHECKPOINT_COMPACT_INTERVAL):
+    """
+    Compact the checkpointer every `interval` seconds until cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            result = await compact(saver)
+            if result["checkpoints"]:
+                print(
+                    f"Checkpoint compaction: removed {result['checkpoints']} checkpoints, "
+                    f"evicted {result['threads']} idle threads"
+                )
+        except Exception as e: # pylint: disable=broad-except
+            print(f"Checkpoint compaction failed: {e}")
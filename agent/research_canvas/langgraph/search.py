@@ -2,16 +2,17 @@
 The search node is responsible for searching the internet for information.
 """
 
-import os
 from typing import cast, List
 from pydantic import BaseModel, Field
 from langchain_core.runnables import RunnableConfig
 from langchain_core.messages import AIMessage, ToolMessage, SystemMessage
 from langchain.tools import tool
-from tavily import TavilyClient
 from copilotkit.langgraph import copilotkit_emit_state, copilotkit_customize_config
 from research_canvas.langgraph.state import AgentState
-from research_canvas.langgraph.model import get_model
+from research_canvas.langgraph.model import get_model, bind_tools_cached
+from research_canvas.langgraph.history import history_window
+from research_canvas.searcher import search_all, compact_search_results
+from research_canvas.llm_cache import cached_ainvoke
 
 class ResourceInput(BaseModel):
     """A resource with a short description"""
@@ -23,18 +24,39 @@ class ResourceInput(BaseModel):
 def ExtractResources(resources: List[ResourceInput]): # pylint: disable=invalid-name,unused-argument
     """Extract the 3-5 most relevant resources from a search result."""
 
-tavily_client = TavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+def _search_call_results(search_calls: List[dict], content: str) -> List[ToolMessage]:
+    """
+    Answer all Search calls of a message, with `content` on the first one.
+    """
+    return [
+        ToolMessage(
+            tool_call_id=tool_call["id"],
+            content=content if i == 0 else "Searched together with the first Search call above."
+        )
+        for i, tool_call in enumerate(search_calls)
+    ]
 
 async def search_node(state: AgentState, config: RunnableConfig):
     """
     The search node is responsible for searching the internet for resources.
     """
 
-    ai_message = cast(AIMessage, state["messages"][-1])
+    # chat_node may have answered other tool calls of the same message already
+    ai_message = next(
+        message for message in reversed(state["messages"]) if isinstance(message, AIMessage)
+    )
+    answered = {
+        message.tool_call_id for message in state["messages"] if isinstance(message, ToolMessage)
+    }
+    search_calls = [
+        tool_call for tool_call in ai_message.tool_calls
+        if tool_call["name"] == "Search" and tool_call["id"] not in answered
+    ]
 
     state["resources"] = state.get("resources", [])
     state["logs"] = state.get("logs", [])
-    queries = ai_message.tool_calls[0]["args"]["queries"]
+    queries = [query for tool_call in search_calls for query in tool_call["args"]["queries"]]
+    logs_offset = len(state["logs"])
 
     for query in queries:
         state["logs"].append({
@@ -44,14 +66,12 @@ async def search_node(state: AgentState, config: RunnableConfig):
 
     await copilotkit_emit_state(config, state)
 
-    search_results = []
-
-    for i, query in enumerate(queries):
-        response = tavily_client.search(query)
-        search_results.append(response)
-        state["logs"][i]["done"] = True
+    async def on_done(i: int):
+        state["logs"][logs_offset + i]["done"] = True
         await copilotkit_emit_state(config, state)
 
+    search_results = await search_all(queries, on_done)
+
     config = copilotkit_customize_config(
         config,
         emit_intermediate_state=[{
@@ -61,27 +81,26 @@ async def search_node(state: AgentState, config: RunnableConfig):
         }],
     )
 
-    model = get_model(state)
+    model = get_model(state, config)
     ainvoke_kwargs = {}
     if model.__class__.__name__ in ["ChatOpenAI"]:
         ainvoke_kwargs["parallel_tool_calls"] = False
 
     # figure out which resources to use
-    response = await model.bind_tools(
+    response = await cached_ainvoke("search_node", bind_tools_cached(
+        model,
         [ExtractResources],
         tool_choice="ExtractResources",
         **ainvoke_kwargs
-    ).ainvoke([
+    ), [
         SystemMessage(
             content="""
             You need to extract the 3-5 most relevant resources from the following search results.
             """
         ),
-        *state["messages"],
-        ToolMessage(
-        tool_call_id=ai_message.tool_calls[0]["id"],
-        content=f"Performed search: {search_results}"
-    )
+        # The turns folded into the history summary don't matter for extraction
+        *history_window(state),
+        *_search_call_results(search_calls, f"Performed search: {compact_search_results(search_results)}"),
     ], config)
 
     state["logs"] = []
@@ -92,9 +111,8 @@ async def search_node(state: AgentState, config: RunnableConfig):
 
     state["resources"].extend(resources)
 
-    state["messages"].append(ToolMessage(
-        tool_call_id=ai_message.tool_calls[0]["id"],
-        content=f"Added the following resources: {resources}"
-    ))
+    state["messages"].extend(
+        _search_call_results(search_calls, f"Added the following resources: {resources}")
+    )
 
     return state
@@ -0,0 +1,103 @@
+"""
+Checkpoint serialization.
+
+Checkpoints hold large, repetitive text (drafts, briefs, search results,
+"Added the following resources: [...]" tool messages). With
+CHECKPOINT_SERDE=compressed, values serialized by the default msgpack based
+JsonPlusSerializer are compressed with zstd (if the zstandard package is
+installed) or zlib once they reach CHECKPOINT_COMPRESS_MIN_BYTES. The
+compression is recorded in the type tag (e.g. "msgpack+zstd"), so existing
+uncompressed checkpoints still load and the state itself is unchanged.
+"""
+
+import os
+import zlib
+from typing import Any, Optional, Tuple
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import zstandard
+except ImportError: # pragma: no cover
+    zstandard = None
+
+# "default" (uncompressed) or "compressed"
+CHECKPOINT_SERDE = os.getenv("CHECKPOINT_SERDE", "default")
+# "zstd" or "zlib"; zstd when the zstandard package is available
+CHECKPOINT_COMPRESSION = os.getenv(
+    "CHECKPOINT_COMPRESSION",
+    "zstd" if zstandard is not None else "zlib"
+)
+# Smaller values are stored uncompressed
+CHECKPOINT_COMPRESS_MIN_BYTES = int(os.getenv("CHECKPOINT_COMPRESS_MIN_BYTES", "1024"))
+CHECKPOINT_COMPRESS_LEVEL = int(os.getenv("CHECKPOINT_COMPRESS_LEVEL", "3"))
+
+class CompressedSerializer(SerializerProtocol):
+    """
+    Compresses the typed output of another serializer above a size threshold.
+    """
+
+    def __init__(
+        self,
+        serde: Optional[SerializerProtocol] = None,
+        compression: str = CHECKPOINT_COMPRESSION,
+        min_bytes: int = CHECKPOINT_COMPRESS_MIN_BYTES,
+        level: int = CHECKPOINT_COMPRESS_LEVEL,
+    ):
+        if compression not in ("zstd", "zlib"):
+            raise ValueError(f"Invalid checkpoint compression specified: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd checkpoint compression requires the zstandard package")
+        self.serde = serde or JsonPlusSerializer()
+        self.compression = compression
+        self.min_bytes = min_bytes
+        self.level = level
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return zlib.compress(data, self.level)
+
+    @staticmethod
+    def _decompress(compression: str, data: bytes) -> bytes:
+        if compression == "zstd":
+            if zstandard is None:
+                raise ValueError("Loading zstd compressed checkpoints requires the zstandard package")
+            return zstandard.ZstdDecompressor().decompress(data)
+        if compression == "zlib":
+            return zlib.decompress(data)
+        raise ValueError(f"Unknown checkpoint compression: {compression}")
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.serde.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.serde.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.serde.dumps_typed(obj)
+        if len(data) < self.min_bytes:
+            return type_, data
+        compressed = self._compress(data)
+        if len(compressed) >= len(data):
+            return type_, data
+        return f"{type_}+{self.compression}", compressed
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if "+" in type_:
+            type_, compression = type_.rsplit("+", 1)
+            payload = self._decompress(compression, payload)
+        return self.serde.loads_typed((type_, payload))
+
+def create_serde() -> Optional[SerializerProtocol]:
+    """
+    Create the checkpoint serializer selected by CHECKPOINT_SERDE, or None for
+    the checkpointer's default.
+    """
+    if CHECKPOINT_SERDE == "default":
+        return None
+    if CHECKPOINT_SERDE == "compressed":
+        return CompressedSerializer()
+
+    raise ValueError(f"Invalid checkpoint serializer specified: {CHECKPOINT_SERDE}")
@@ -3,7 +3,7 @@ This is the state definition for the AI.
 It defines the state of the agent and the state of the conversation.
 """
 
-from typing import List, Dict, Any, TypedDict
+from typing import List, Dict, Any, TypedDict, NotRequired
 from langgraph.graph import MessagesState
 
 class Resource(TypedDict):
@@ -14,6 +14,13 @@ class Resource(TypedDict):
     title: str
     description: str
 
+class Audience(TypedDict, total=False):
+    """
+    The target audience of a marketing campaign.
+    """
+    description: str
+    age_range: str  # e.g. "18-24", "55+"
+
 class Campaign(TypedDict):
     """
     Represents a marketing campaign.
@@ -23,6 +30,10 @@ class Campaign(TypedDict):
     status: str  # "active", "draft", "completed", "scheduled"
     brief: str
     createdAt: str
+    goals: NotRequired[str]
+    audience: NotRequired[Audience]
+    channels: NotRequired[List[str]]
+    budget: NotRequired[str]
 
 class Log(TypedDict):
     """
@@ -41,4 +52,8 @@ class AgentState(MessagesState):
     report: str
     resources: List[Resource]
     logs: List[Log]
-    campaigns: List[Campaign]
+    campaigns: List[Campaign]  # campaigns_by_id in order, as shown by the UI
+    campaigns_by_id: Dict[str, Campaign]
+    current_campaign_id: str  # campaign the customization tools apply to
+    history_summary: str  # summary of the messages up to history_summary_until
+    history_summary_until: str  # id of the last summarized message
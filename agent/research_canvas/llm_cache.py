@@ -0,0 +1,311 @@
+"""
+Exact-match cache for LLM responses of deterministic calls.
+
+Responses are keyed by the model (class, name, temperature), the normalized
+messages (message and tool call IDs stripped, whitespace trimmed) and a hash
+of the bound tool schemas and call arguments. The cache has two tiers: an
+in-memory LRU and, if LLM_CACHE_PATH is set, a SQLite (WAL) database shared
+by the worker processes of a host.
+
+Caching is opt-in per call site: LLM_CACHE_SITES is a comma separated list
+of sites (search_node, perform_search, test_gemini, copilotkit) or "all".
+Only calls at temperature 0 are cached.
+
+The SQLite tier deletes expired rows every LLM_CACHE_PRUNE_EVERY writes, and
+then the oldest rows until the responses fit into LLM_CACHE_DISK_MAX_BYTES.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from typing import Any, Dict, Optional, Sequence
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from research_canvas.cache import LRUCache
+
+LLM_CACHE_SITES = frozenset(
+    site.strip() for site in os.getenv("LLM_CACHE_SITES", "").split(",") if site.strip()
+)
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 60 * 60)))
+
+LLM_CACHE = LRUCache(
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl=LLM_CACHE_TTL,
+)
+
+class LLMResponseStore:
+    """
+    A SQLite (WAL) backed store of cached LLM responses as JSON.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        prune_every: int = 100
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.prune_every = prune_every
+        self._puts = 0
+        self._puts_lock = threading.Lock()
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                site TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS llm_responses_created_at ON llm_responses (created_at)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections may only be used on the thread that created them
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Get the stored response for a key, or None if it is missing or expired.
+        """
+        row = self._connection().execute(
+            "SELECT value, created_at FROM llm_responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (self.ttl is not None and row[1] + self.ttl <= time.time()):
+            return None
+        return row[0]
+
+    def put(self, key: str, site: str, value: str):
+        """
+        Store a response, replacing any previous one.
+        """
+        self._connection().execute(
+            "INSERT OR REPLACE INTO llm_responses (key, site, value, created_at) VALUES (?, ?, ?, ?)",
+            (key, site, value, time.time())
+        )
+        with self._puts_lock:
+            self._puts += 1
+            due = self.prune_every > 0 and self._puts % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Delete expired responses, then the oldest ones until the rest fits
+        into `max_bytes`. Returns the number of rows deleted.
+        """
+        conn = self._connection()
+        deleted = 0
+        if self.ttl is not None:
+            deleted += conn.execute(
+                "DELETE FROM llm_responses WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+        if self.max_bytes is not None:
+            deleted += conn.execute(
+                """
+                DELETE FROM llm_responses WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(LENGTH(CAST(value AS BLOB)))
+                            OVER (ORDER BY created_at DESC, key) AS total
+                        FROM llm_responses
+                    ) WHERE total > ?
+                )
+                """,
+                (self.max_bytes,)
+            ).rowcount
+        return deleted
+
+
+_STORE_PATH = os.getenv("LLM_CACHE_PATH")
+
+LLM_RESPONSE_STORE = LLMResponseStore(
+    _STORE_PATH,
+    ttl=LLM_CACHE_TTL,
+    max_bytes=int(os.getenv("LLM_CACHE_DISK_MAX_BYTES", str(256 * 1024 * 1024))),
+    prune_every=int(os.getenv("LLM_CACHE_PRUNE_EVERY", "100")),
+) if _STORE_PATH else None
+
+_STATS_LOCK = threading.Lock()
+_SITE_STATS: Dict[str, Dict[str, int]] = {}
+
+def _count(site: str, counter: str):
+    with _STATS_LOCK:
+        stats = _SITE_STATS.setdefault(
+            site, {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+        )
+        stats[counter] += 1
+
+def llm_cache_enabled(site: str) -> bool:
+    """
+    Whether responses are cached at a call site.
+    """
+    return "all" in LLM_CACHE_SITES or site in LLM_CACHE_SITES
+
+def _field(obj: Any, name: str) -> Any:
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+def _normalize_message(message: Any) -> Dict[str, Any]:
+    """
+    Reduce a LangChain message or an OpenAI style message (dict or object) to
+    what the model sees, without message and tool call IDs.
+    """
+    if isinstance(message, BaseMessage):
+        role = message.type
+        content = message.content
+        tool_calls = [
+            {"name": call["name"], "args": call["args"]}
+            for call in getattr(message, "tool_calls", None) or []
+        ]
+    else:
+        role = _field(message, "role")
+        content = _field(message, "content")
+        tool_calls = []
+        for call in _field(message, "tool_calls") or []:
+            function = _field(call, "function")
+            args = _field(function, "arguments")
+            if isinstance(args, str):
+                try:
+                    args = json.loads(args)
+                except ValueError:
+                    pass
+            tool_calls.append({"name": _field(function, "name"), "args": args})
+    if isinstance(content, str):
+        content = content.strip()
+    return {"role": role, "content": content, "tool_calls": tool_calls}
+
+def make_key(model: Any, messages: Sequence[Any], tools: Any = None) -> str:
+    """
+    Get the cache key for a call of `model` (any JSON serializable
+    description) with `messages` and `tools` (schemas and call arguments).
+    """
+    tools_hash = hashlib.sha256(
+        json.dumps(tools, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+    payload = json.dumps({
+        "model": model,
+        "messages": [_normalize_message(message) for message in messages],
+        "tools": tools_hash,
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def _runnable_key(runnable: Any, messages: Sequence[BaseMessage]) -> Optional[str]:
+    """
+    Get the cache key for a chat model, or a model with bound tools and
+    arguments. None if the model is not deterministic.
+    """
+    kwargs: Dict[str, Any] = {}
+    # RunnableBinding (e.g. from bind_tools) wraps the model and its arguments
+    while hasattr(runnable, "bound") and hasattr(runnable, "kwargs"):
+        kwargs = {**runnable.kwargs, **kwargs}
+        runnable = runnable.bound
+    temperature = getattr(runnable, "temperature", None)
+    if temperature != 0:
+        return None
+    model = {
+        "class": runnable.__class__.__name__,
+        "name": getattr(runnable, "model_name", None) or getattr(runnable, "model", None),
+        "temperature": temperature,
+    }
+    return make_key(model, messages, kwargs)
+
+async def llm_cache_get(site: str, key: str) -> Any:
+    """
+    Get a cached (JSON serializable) response, or None on a miss.
+    """
+    value = LLM_CACHE.get(key)
+    if value is not None:
+        _count(site, "memory_hits")
+        return json.loads(value)
+    if LLM_RESPONSE_STORE is not None:
+        value = await asyncio.to_thread(LLM_RESPONSE_STORE.get, key)
+        if value is not None:
+            _count(site, "disk_hits")
+            LLM_CACHE.set(key, value)
+            return json.loads(value)
+    _count(site, "misses")
+    return None
+
+async def llm_cache_put(site: str, key: str, response: Any):
+    """
+    Cache a (JSON serializable) response.
+    """
+    value = json.dumps(response)
+    LLM_CACHE.set(key, value)
+    if LLM_RESPONSE_STORE is not None:
+        await asyncio.to_thread(LLM_RESPONSE_STORE.put, key, site, value)
+    _count(site, "stores")
+
+def chat_cache_key(site: str, runnable: Any, messages: Sequence[BaseMessage]) -> Optional[str]:
+    """
+    Get the cache key for a LangChain model call, or None if responses at
+    this site are not cached.
+    """
+    if not llm_cache_enabled(site):
+        return None
+    return _runnable_key(runnable, messages)
+
+async def get_cached_message(site: str, key: Optional[str]) -> Optional[BaseMessage]:
+    """
+    Get a cached LangChain message, with a fresh id.
+    """
+    if key is None:
+        return None
+    data = await llm_cache_get(site, key)
+    if data is None:
+        return None
+    return messages_from_dict([data])[0]
+
+async def cache_message(site: str, key: Optional[str], message: BaseMessage):
+    """
+    Cache a LangChain message. The id and token usage are not kept, as a
+    cache hit is a new message that costs no tokens.
+    """
+    if key is None:
+        return
+    data = message_to_dict(message)
+    data["data"] = {**data["data"], "id": None, "usage_metadata": None}
+    await llm_cache_put(site, key, data)
+
+async def cached_ainvoke(site: str, runnable: Any, messages: Sequence[BaseMessage], config: Any = None) -> BaseMessage:
+    """
+    `runnable.ainvoke(messages, config)`, answered from the cache when
+    responses at `site` are cached and the same call was made before.
+    """
+    key = chat_cache_key(site, runnable, messages)
+    cached = await get_cached_message(site, key)
+    if cached is not None:
+        return cached
+    response = await runnable.ainvoke(list(messages), config)
+    await cache_message(site, key, response)
+    return response
+
+def llm_cache_stats() -> Dict[str, Any]:
+    """
+    Hit counters per call site and the memory tier statistics.
+    """
+    with _STATS_LOCK:
+        sites = {site: dict(stats) for site, stats in _SITE_STATS.items()}
+    for stats in sites.values():
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+    return {
+        "enabled_sites": sorted(LLM_CACHE_SITES),
+        "sites": sites,
+        "memory": LLM_CACHE.stats(),
+    }
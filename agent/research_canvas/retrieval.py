@@ -0,0 +1,235 @@
+"""
+Passage-level retrieval over downloaded resources.
+
+Resources are split into passages and indexed with BM25 as they are
+downloaded, so the prompt only needs the passages that are relevant to the
+latest user message instead of every resource in full. Everything is local;
+no embeddings or network calls are involved.
+"""
+
+import os
+import re
+import math
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from research_canvas.tokens import count_tokens
+
+# Passages are packed from paragraphs up to roughly this many characters
+PASSAGE_MAX_CHARS = int(os.getenv("PASSAGE_MAX_CHARS", "1000"))
+# Number of passages injected into the prompt
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "8"))
+# Least recently indexed resources are dropped beyond this many
+PASSAGE_INDEX_MAX_URLS = int(os.getenv("PASSAGE_INDEX_MAX_URLS", "1000"))
+
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+
+# Single CJK characters, otherwise runs of letters and digits
+_TOKEN = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]|[^\W_]+")
+_STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how i if in into is it its of on or
+our so that the their then there these this to was we what when where which who
+will with you your
+""".split())
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lowercase terms for BM25.
+    """
+    return [
+        token for token in _TOKEN.findall(text.lower())
+        if token not in _STOPWORDS
+    ]
+
+def chunk_text(text: str, max_chars: int = PASSAGE_MAX_CHARS) -> List[str]:
+    """
+    Split markdown into passages of whole paragraphs of up to `max_chars`.
+    Paragraphs longer than that are split on line and then on character bounds.
+    """
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        while len(paragraph) > max_chars:
+            cut = paragraph.rfind("\n", 0, max_chars)
+            if cut <= 0:
+                cut = paragraph.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(paragraph[:cut].strip())
+            paragraph = paragraph[cut:].strip()
+        if paragraph:
+            pieces.append(paragraph)
+
+    passages = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 2 > max_chars:
+            passages.append(current)
+            current = piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        passages.append(current)
+    return passages
+
+class PassageIndex:
+    """
+    An incremental BM25 index of resource passages, keyed by URL.
+    """
+
+    def __init__(self, max_urls: int = PASSAGE_INDEX_MAX_URLS):
+        self.max_urls = max_urls
+        self._lock = threading.Lock()
+        self._urls: "OrderedDict[str, Tuple[int, List[int]]]" = OrderedDict()  # url -> (content hash, passage ids)
+        self._passages: Dict[int, Tuple[str, str, int, Tuple[str, ...], int]] = {}  # id -> (url, text, length, terms, tokens)
+        self._postings: Dict[str, Dict[int, int]] = {}  # term -> {passage id: term frequency}
+        self._total_length = 0
+        self._next_id = 0
+
+    def add(self, url: str, content: str):
+        """
+        Index (or re-index) the content of a resource.
+        """
+        passages = []
+        for text in chunk_text(content):
+            terms = Counter(tokenize(text))
+            passages.append((text, terms, sum(terms.values()), count_tokens(text)))
+
+        with self._lock:
+            self._remove(url)
+            ids = []
+            for text, terms, length, tokens in passages:
+                passage_id = self._next_id
+                self._next_id += 1
+                self._passages[passage_id] = (url, text, length, tuple(terms), tokens)
+                self._total_length += length
+                for term, frequency in terms.items():
+                    self._postings.setdefault(term, {})[passage_id] = frequency
+                ids.append(passage_id)
+            self._urls[url] = (hash(content), ids)
+            while len(self._urls) > self.max_urls:
+                self._remove(next(iter(self._urls)))
+
+    def ensure(self, url: str, content: str):
+        """
+        Index a resource unless the same content is already indexed.
+        """
+        with self._lock:
+            indexed = self._urls.get(url)
+            if indexed is not None and indexed[0] == hash(content):
+                self._urls.move_to_end(url)
+                return
+        self.add(url, content)
+
+    def remove(self, url: str):
+        """
+        Drop a resource from the index.
+        """
+        with self._lock:
+            self._remove(url)
+
+    def _remove(self, url: str):
+        indexed = self._urls.pop(url, None)
+        if indexed is None:
+            return
+        for passage_id in indexed[1]:
+            _, _, length, terms, _ = self._passages.pop(passage_id)
+            self._total_length -= length
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(passage_id, None)
+                    if not postings:
+                        del self._postings[term]
+
+    def search(
+        self,
+        query: str,
+        urls: Optional[List[str]] = None,
+        k: int = RETRIEVAL_TOP_K
+    ) -> List[Tuple[str, str, float, int]]:
+        """
+        Get the `k` best passages for a query as (url, text, score, tokens),
+        optionally restricted to some resources.
+        """
+        allowed = set(urls) if urls is not None else None
+        with self._lock:
+            count = len(self._passages)
+            if not count:
+                return []
+            average_length = self._total_length / count
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for passage_id, frequency in postings.items():
+                    url, _, length, _, _ = self._passages[passage_id]
+                    if allowed is not None and url not in allowed:
+                        continue
+                    norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * length / average_length)
+                    scores[passage_id] = scores.get(passage_id, 0.0) + \
+                        idf * frequency * (_BM25_K1 + 1) / (frequency + norm)
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            return [
+                (url, text, score, tokens)
+                for (url, text, _, _, tokens), score in (
+                    (self._passages[passage_id], score) for passage_id, score in best
+                )
+            ]
+
+    def first_passages(self, urls: List[str], k: int = RETRIEVAL_TOP_K) -> List[Tuple[str, str, float, int]]:
+        """
+        Get the opening passage of each resource, for when there is no query.
+        """
+        with self._lock:
+            result = []
+            for url in urls:
+                indexed = self._urls.get(url)
+                if indexed and indexed[1]:
+                    _, text, _, _, tokens = self._passages[indexed[1][0]]
+                    result.append((url, text, 0.0, tokens))
+            return result[:k]
+
+
+PASSAGE_INDEX = PassageIndex()
+
+def select_passages(
+    resources: List[Dict[str, Any]],
+    query: str,
+    k: int = RETRIEVAL_TOP_K,
+    max_tokens: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Replace the full "content" of resources with their passages that are most
+    relevant to the query (top `k` across all resources). With `max_tokens`,
+    passages that no longer fit into that many tokens are left out.
+    """
+    for resource in resources:
+        if resource.get("content"):
+            PASSAGE_INDEX.ensure(resource["url"], resource["content"])
+
+    urls = [resource["url"] for resource in resources]
+    hits = PASSAGE_INDEX.search(query, urls, k) if query.strip() else []
+    if not hits:
+        hits = PASSAGE_INDEX.first_passages(urls, k)
+
+    passages: Dict[str, List[str]] = {}
+    used_tokens = 0
+    for url, text, _, tokens in hits:
+        if max_tokens is not None and used_tokens + tokens > max_tokens:
+            continue
+        used_tokens += tokens
+        passages.setdefault(url, []).append(text)
+
+    return [
+        {
+            **{key: value for key, value in resource.items() if key != "content"},
+            "passages": passages.get(resource["url"], []),
+        }
+        for resource in resources
+    ]
@@ -0,0 +1,155 @@
+"""
+Web search shared by the langgraph and crewai agents.
+
+Queries run concurrently on the async Tavily client, so a search never blocks
+the event loop, and each query has its own timeout. Responses are cached by
+normalized query and search parameters, and duplicate queries within one call
+are only sent once. Before the responses are handed to the model they are
+compacted to a token budget (see compact_search_results).
+"""
+
+import os
+import json
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from tavily import AsyncTavilyClient
+from research_canvas.cache import LRUCache
+from research_canvas.content_store import canonical_url
+from research_canvas.tokens import count_tokens
+
+# Maximum number of queries sent to Tavily in parallel
+SEARCH_CONCURRENCY = int(os.getenv("SEARCH_CONCURRENCY", "4"))
+# Seconds before a single query is given up
+SEARCH_TIMEOUT = float(os.getenv("SEARCH_TIMEOUT", "20"))
+# Token budget for the search results passed to the ExtractResources call
+SEARCH_RESULTS_MAX_TOKENS = int(os.getenv("SEARCH_RESULTS_MAX_TOKENS", "3000"))
+# Snippets longer than this are cut off
+SEARCH_SNIPPET_MAX_CHARS = int(os.getenv("SEARCH_SNIPPET_MAX_CHARS", "400"))
+
+tavily_client = AsyncTavilyClient(api_key=os.getenv("TAVILY_API_KEY"))
+
+SEARCH_CACHE = LRUCache(
+    max_bytes=int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", str(60 * 60))),
+)
+
+# Queries answered by another identical query of the same call
+SEARCH_STATS = {"deduplicated": 0, "compactions": 0, "tokens_saved": 0}
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for caching: case-insensitive, collapsed whitespace,
+    no surrounding quotes or trailing punctuation.
+    """
+    return " ".join(query.lower().split()).strip("\"'").rstrip("?!.")
+
+def _cache_key(query: str, search_kwargs: Dict[str, Any]) -> str:
+    return json.dumps([normalize_query(query), search_kwargs], sort_keys=True, default=str)
+
+async def _search(query: str, search_kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    key = _cache_key(query, search_kwargs)
+    cached = SEARCH_CACHE.get(key)
+    if cached is not None:
+        return cached
+    try:
+        response = await asyncio.wait_for(
+            tavily_client.search(query, **search_kwargs), SEARCH_TIMEOUT
+        )
+    except Exception as e: # pylint: disable=broad-except
+        error = str(e) or e.__class__.__name__
+        print(f"Search for {query!r} failed: {error}")
+        return {"query": query, "results": [], "error": error}
+    SEARCH_CACHE.set(key, response, size=len(json.dumps(response, default=str)))
+    return response
+
+async def search_all(
+    queries: List[str],
+    on_done: Optional[Callable[[int], Awaitable[None]]] = None,
+    **search_kwargs
+) -> List[Dict[str, Any]]:
+    """
+    Run all queries concurrently and return their responses in query order.
+    `on_done(i)` is awaited as soon as query i has finished, e.g. to update logs.
+    A failed or timed out query yields a response without results.
+    Extra keyword arguments are passed to Tavily and are part of the cache key.
+    """
+    semaphore = asyncio.Semaphore(SEARCH_CONCURRENCY)
+    responses: List[Dict[str, Any]] = [{} for _ in queries]
+
+    # Group identical queries so each one is only searched once
+    groups: Dict[str, List[int]] = {}
+    for i, query in enumerate(queries):
+        groups.setdefault(_cache_key(query, search_kwargs), []).append(i)
+    SEARCH_STATS["deduplicated"] += len(queries) - len(groups)
+
+    async def search(indices: List[int]):
+        async with semaphore:
+            response = await _search(queries[indices[0]], search_kwargs)
+        for i in indices:
+            responses[i] = response
+        return indices
+
+    for finished in asyncio.as_completed(
+        [search(indices) for indices in groups.values()]
+    ):
+        indices = await finished
+        if on_done is not None:
+            for i in indices:
+                await on_done(i)
+
+    return responses
+
+def compact_search_results(
+    responses: List[Dict[str, Any]],
+    max_tokens: int = SEARCH_RESULTS_MAX_TOKENS
+) -> str:
+    """
+    Reduce Tavily responses to url/title/snippet/score, deduplicate URLs across
+    queries (keeping the best score), and keep the highest scoring results
+    that fit into `max_tokens`. Returns compact JSON for the prompt.
+    """
+    best: Dict[str, Dict[str, Any]] = {}
+    for response in responses:
+        for result in response.get("results", []):
+            url = result.get("url")
+            if not url:
+                continue
+            snippet = " ".join((result.get("content") or "").split())
+            if len(snippet) > SEARCH_SNIPPET_MAX_CHARS:
+                snippet = snippet[:SEARCH_SNIPPET_MAX_CHARS].rsplit(" ", 1)[0] + "..."
+            item = {
+                "url": url,
+                "title": result.get("title", ""),
+                "snippet": snippet,
+                "score": round(float(result.get("score") or 0.0), 3),
+            }
+            key = canonical_url(url)
+            if key not in best or item["score"] > best[key]["score"]:
+                best[key] = item
+
+    kept = []
+    used_tokens = 2
+    for item in sorted(best.values(), key=lambda item: item["score"], reverse=True):
+        item_json = json.dumps(item, ensure_ascii=False, separators=(",", ":"))
+        item_tokens = count_tokens(item_json) + 1
+        if used_tokens + item_tokens > max_tokens:
+            break
+        kept.append(item_json)
+        used_tokens += item_tokens
+    compacted = "[" + ",".join(kept) + "]"
+
+    original_tokens = count_tokens(str(responses))
+    saved = max(original_tokens - used_tokens, 0)
+    SEARCH_STATS["compactions"] += 1
+    SEARCH_STATS["tokens_saved"] += saved
+    print(
+        f"Compacted search results: {original_tokens} -> {used_tokens} tokens "
+        f"({len(kept)} of {len(best)} results, {saved} tokens saved)"
+    )
+    return compacted
+
+def search_stats():
+    """
+    Get the search cache counters.
+    """
+    return {**SEARCH_CACHE.stats(), **SEARCH_STATS}
@@ -0,0 +1,48 @@
+"""
+Token counting for prompt budgeting.
+
+Uses tiktoken's cl100k_base encoding when it is available. Otherwise falls back
+to the usual estimate of four characters per token, which is close enough for
+budgeting across providers.
+"""
+
+import threading
+
+_ENCODING = None
+_ENCODING_LOADED = False
+_LOCK = threading.Lock()
+
+def _get_encoding():
+    global _ENCODING, _ENCODING_LOADED # pylint: disable=global-statement
+    with _LOCK:
+        if not _ENCODING_LOADED:
+            try:
+                import tiktoken # pylint: disable=import-outside-toplevel
+                _ENCODING = tiktoken.get_encoding("cl100k_base")
+            except Exception: # pylint: disable=broad-except
+                _ENCODING = None
+            _ENCODING_LOADED = True
+        return _ENCODING
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text.
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut a text down to at most `max_tokens` tokens.
+    """
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -10,6 +10,13 @@ export type Campaign = {
   status: 'active' | 'draft' | 'completed' | 'scheduled';
   brief: string;
   createdAt: string;
+  goals?: string;
+  audience?: {
+    description?: string;
+    age_range?: string;
+  };
+  channels?: string[];
+  budget?: string;
 };
 
 export type AgentState = {
@@ -19,4 +26,6 @@ export type AgentState = {
   resources: any[];
   logs: any[];
   campaigns: Campaign[];
+  campaigns_by_id?: Record<string, Campaign>;
+  current_campaign_id?: string;
 }
\ No newline at end of file